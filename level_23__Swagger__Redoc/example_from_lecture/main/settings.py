@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import tempfile
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +47,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # метрики Prometheus (/metrics): время ответа включает все остальные middleware
+    'myapp.metrics.MetricsMiddleware',
+    'myapp.timing.ServerTimingMiddleware',
+    # считает запросы всех остальных middleware и вью
+    'myapp.querybudget.QueryBudgetMiddleware',
+    # чтение с реплик, запись и чтение после записи — из основной базы
+    'myapp.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,7 +67,8 @@ ROOT_URLCONF = 'main.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с учётом времени рендеринга (myapp/timing.py)
+        'BACKEND': 'myapp.timing.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIRS],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,11 +87,98 @@ WSGI_APPLICATION = 'main.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite для нескольких процессов (сравнение — manage.py bench_sqlite):
+# WAL — читатели не ждут писателя; synchronous=NORMAL — fsync только при
+# checkpoint (в WAL это безопасно для целостности); mmap и кэш страниц — меньше
+# системных вызовов при чтении; busy_timeout — ждать блокировку, а не сразу
+# "database is locked"; BEGIN IMMEDIATE — транзакция берёт блокировку записи
+# сразу, иначе две транзакции "прочитал, потом пишу" мешают друг другу без ожидания
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'   # 256 МБ
+        'PRAGMA cache_size=-65536;'     # 64 МБ
+        'PRAGMA busy_timeout=5000;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': SQLITE_OPTIONS,
+    },
+    # Реплика только для чтения (myapp/routers.py); используется, если указана
+    # в DATABASE_REPLICAS. Локально её заменяет копия основной базы:
+    #     cp db.sqlite3 db_replica.sqlite3
+    # В тестах — та же база, что и 'default' (MIRROR)
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['myapp.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []          # например ['replica']
+REPLICA_PIN_SECONDS = 5         # после записи пользователь читает из основной базы столько секунд
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Кэш ответов myapp (см. myapp/cache.py).
+    # LocMemCache — отдельный в каждом процессе; чтобы процессы делили записи,
+    # можно указать FileBasedCache:
+    #     'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    #     'LOCATION': BASE_DIR / 'cache' / 'responses',
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 300,
+    },
+    # Ответы на запросы с Idempotency-Key (см. myapp/idempotency.py):
+    # TIMEOUT — сколько хранится ключ, MAX_ENTRIES — сколько ключей.
+    # Для нескольких процессов нужен общий кэш с атомарным add()
+    # (Redis, Memcached, DatabaseCache)
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'idempotency',
+        'TIMEOUT': 24 * 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+RESPONSE_CACHE_ALIAS = 'responses'
+IDEMPOTENCY_CACHE_ALIAS = 'idempotency'
+IDEMPOTENCY_WAIT_TIMEOUT = 10   # сколько повтор ждёт ответа первого запроса, с
+
+
+# Django REST framework
+
+REST_FRAMEWORK = {
+    # JSON через orjson (если установлен); MessagePack и CBOR — только при
+    # установленных msgpack / cbor2. Формат выбирается по заголовку Accept
+    'DEFAULT_RENDERER_CLASSES': [
+        'myapp.renderers.FastJSONRenderer',
+        *(['myapp.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        *(['myapp.renderers.CBORRenderer'] if find_spec('cbor2') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'myapp.renderers.FastJSONParser',
+        *(['myapp.renderers.MessagePackParser'] if find_spec('msgpack') else []),
+        *(['myapp.renderers.CBORParser'] if find_spec('cbor2') else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 
@@ -141,3 +238,27 @@ LOGIN_REDIRECT_URL = '/'       # куда редиректить после ус
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
+# Бюджет SQL-запросов и поиск N+1 (myapp/querybudget.py)
+QUERY_BUDGET_ENABLED = True
+QUERY_BUDGET_DEFAULT = None             # бюджет вью без атрибута query_budget
+QUERY_BUDGET_REPEAT_THRESHOLD = 5       # столько одинаковых по форме запросов — N+1
+QUERY_BUDGET_RAISE = False              # True — превышение бюджета вызывает исключение (тесты)
+
+# Файлы метрик процессов (myapp/metrics.py): общий для всех воркеров локальный каталог
+METRICS_DIR = Path(tempfile.gettempdir()) / 'm3_fullstack_metrics'
+# тесты пишут метрики во временный каталог (myapp/test_runner.py)
+TEST_RUNNER = 'myapp.test_runner.TestRunner'
+
+# Доля ответов с заголовком Server-Timing (myapp/timing.py): 0 — выключено, 1 — все
+SERVER_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.0
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'myapp.querybudget': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
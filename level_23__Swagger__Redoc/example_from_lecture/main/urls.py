@@ -18,6 +18,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
 
+from myapp.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', TemplateView.as_view(
@@ -28,4 +30,5 @@ urlpatterns = [
     path('myapp/', include('myapp.urls')),
     path('feedback/', include('feedback.urls')),
     path('accounts/', include('accounts.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
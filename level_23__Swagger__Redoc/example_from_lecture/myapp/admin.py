@@ -4,4 +4,12 @@ from .models import Author, Book, BookDetail, Genre
 
 admin.site.register(Author)
 
-admin.site.register(Book)
+
+@admin.register(Book)
+class BookAdmin(admin.ModelAdmin):
+    list_display = ['title', 'author', 'year_published', 'is_deleted']
+    list_filter = ['is_deleted']
+
+    def get_queryset(self, request):
+        # в админке видны и мягко удалённые книги — их можно восстановить
+        return Book.all_objects.select_related('author')
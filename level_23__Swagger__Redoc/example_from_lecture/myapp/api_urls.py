@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BookViewSet, AuthorViewSet
+from . import async_views
+from .batch import BatchView
+from .views import BookViewSet, AuthorViewSet, AuthorAutocompleteView, FuzzySearchView
 
 router = DefaultRouter()
 router.register(r'books', BookViewSet)
@@ -8,6 +10,15 @@ router.register(r'authors', AuthorViewSet)
 
 
 urlpatterns = [
+    # async-варианты чтения (выигрыш — при запуске под ASGI: main/asgi.py)
+    path('async/books/', async_views.book_list, name='async-book-list'),
+    path('async/books/<int:pk>/', async_views.book_detail, name='async-book-detail'),
+    path('async/authors/', async_views.author_list, name='async-author-list'),
+    path('async/authors/<int:pk>/', async_views.author_detail, name='async-author-detail'),
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('search/fuzzy/', FuzzySearchView.as_view(), name='fuzzy-search'),
+    # до router.urls, иначе "autocomplete" будет принят за pk автора
+    path('authors/autocomplete/', AuthorAutocompleteView.as_view(), name='author-autocomplete'),
     path('', include(router.urls)),
 ]
 
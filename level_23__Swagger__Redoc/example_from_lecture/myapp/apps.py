@@ -5,3 +5,12 @@ class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
 
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .timing import install_dispatch
+        # обёртки запросов к базе текущего HTTP-запроса (метрики, бюджет запросов)
+        connection_created.connect(install_dispatch)
+
+        # обработчики сигналов, обновляющие поисковые индексы и счётчики книг
+        from . import autocomplete, counters, fuzzy, search  # noqa: F401
@@ -0,0 +1,75 @@
+"""
+Асинхронные эндпойнты чтения книг и авторов.
+
+Работают на async ORM (aiterator, aget, acount) и под ASGI (main/asgi.py)
+не занимают поток на время ожидания базы. Формат ответа совпадает
+с BookViewSet / AuthorViewSet (keyset-пагинация, те же курсоры).
+"""
+from django.http import JsonResponse
+from rest_framework.exceptions import NotFound
+
+from .fastread import ValuesPlan
+from .models import Author, Book
+from .pagination import AuthorKeysetPagination, BookKeysetPagination
+from .serializers import AuthorSerializer, BookSerializer
+
+_plans = {}
+
+
+def _json(data, status=200):
+    # Как JSONRenderer DRF: кириллица без \u-экранирования
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def get_plan(serializer_class):
+    # План строится один раз на процесс: сериализаторы без вложенных полей
+    if serializer_class not in _plans:
+        _plans[serializer_class] = ValuesPlan.compile(serializer_class())
+    return _plans[serializer_class]
+
+
+async def _list(request, queryset, serializer_class, pagination_class):
+    plan = get_plan(serializer_class)
+    paginator = pagination_class()
+    ordering = [field.lstrip('-') for field in paginator.ordering]
+    rows = queryset.values(*dict.fromkeys(plan.values_fields + ordering))
+    try:
+        page = await paginator.apaginate_queryset(rows, request)
+    except NotFound as exc:
+        return _json({'detail': str(exc.detail)}, status=404)
+    return _json({
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': [plan.to_representation(row) for row in page],
+    })
+
+
+async def _detail(queryset, serializer_class, pk):
+    plan = get_plan(serializer_class)
+    try:
+        row = await queryset.values(*plan.values_fields).aget(pk=pk)
+    except queryset.model.DoesNotExist:
+        return None
+    return plan.to_representation(row)
+
+
+async def book_list(request):
+    return await _list(request, Book.objects.all(), BookSerializer, BookKeysetPagination)
+
+
+async def book_detail(request, pk):
+    data = await _detail(Book.objects.all(), BookSerializer, pk)
+    if data is None:
+        return _json({'detail': 'No Book matches the given query.'}, status=404)
+    return _json(data)
+
+
+async def author_list(request):
+    return await _list(request, Author.objects.all(), AuthorSerializer, AuthorKeysetPagination)
+
+
+async def author_detail(request, pk):
+    data = await _detail(Author.objects.all(), AuthorSerializer, pk)
+    if data is None:
+        return _json({'detail': 'No Author matches the given query.'}, status=404)
+    return _json(data)
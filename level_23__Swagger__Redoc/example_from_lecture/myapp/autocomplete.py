@@ -0,0 +1,133 @@
+"""
+Автодополнение авторов по префиксу (GET /api/authors/autocomplete/?q=).
+
+Индекс — отсортированный список (ключ, id) в памяти процесса; ключи —
+имя целиком и имя начиная с каждого следующего слова ("федор достоевский",
+"достоевский"), поэтому находится и фамилия. Поиск — bisect по префиксу,
+без обращения к базе.
+
+Изменения авторов в этом процессе применяются к индексу после commit
+(сигналы post_save / post_delete). Изменения из других процессов
+замечаются по своей версии индекса ModelVersion('myapp.author.name') не чаще
+раза в check_interval секунд и приводят к полной перестройке. Версия
+увеличивается только при изменении имён: запись книги меняет
+Author.books_count и версию Author, но индекс не перестраивает.
+"""
+import bisect
+import re
+import threading
+import time
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Author, ModelVersion
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', text.lower().replace('ё', 'е')))
+
+
+class PrefixIndex:
+    check_interval = 1.0
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        # своя версия: меняется только вместе со значениями поля
+        self.label = f'{model._meta.label_lower}.{field}'
+        self.entries = []
+        self.names = {}
+        self.stamp = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def keys(name):
+        words = normalize(name).split()
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def get_stamp(self):
+        return ModelVersion.get_stamps(self.label)[self.label]
+
+    def bump(self):
+        """Отмечает изменение значений поля (в транзакции — после commit)."""
+        ModelVersion.bump(self.label)
+
+    def build(self):
+        stamp = self.get_stamp()
+        names = dict(self.model._base_manager.values_list('pk', self.field))
+        entries = sorted((key, pk) for pk, name in names.items() for key in self.keys(name))
+        with self.lock:
+            self.entries, self.names, self.stamp = entries, names, stamp
+
+    def refresh(self):
+        now = time.monotonic()
+        if self.stamp is not None and now - self.checked < self.check_interval:
+            return
+        self.checked = now
+        if self.stamp is None or self.get_stamp() != self.stamp:
+            self.build()
+
+    def search(self, prefix, limit=10):
+        """[{"id", "name"}] авторов, имя или одно из слов имени которых начинается с prefix."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        self.refresh()
+        entries, names = self.entries, self.names
+        results = {}
+        for i in range(bisect.bisect_left(entries, (prefix,)), len(entries)):
+            key, pk = entries[i]
+            if not key.startswith(prefix):
+                break
+            if pk in names:
+                results.setdefault(pk, {'id': pk, 'name': names[pk]})
+                if len(results) >= limit:
+                    break
+        return list(results.values())
+
+    def update(self, pk, name=None):
+        """Заменяет (или при name=None удаляет) записи объекта pk."""
+        if self.stamp is None:
+            return
+        with self.lock:
+            entries = list(self.entries)
+            if pk in self.names:
+                for key in self.keys(self.names[pk]):
+                    i = bisect.bisect_left(entries, (key, pk))
+                    if i < len(entries) and entries[i] == (key, pk):
+                        del entries[i]
+            names = dict(self.names)
+            names.pop(pk, None)
+            if name is not None:
+                names[pk] = name
+                for key in self.keys(name):
+                    bisect.insort(entries, (key, pk))
+            self.entries, self.names = entries, names
+        # версия выросла только из-за этого изменения — индекс актуален, перестройка не нужна
+        stamp = self.get_stamp()
+        if stamp[0] == self.stamp[0] + 1:
+            self.stamp = stamp
+        elif stamp != self.stamp:
+            self.stamp = None
+
+
+authors = PrefixIndex(Author, 'name')
+
+
+@receiver(post_save, sender=Author)
+def update_author(sender, instance, update_fields, **kwargs):
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    # версия увеличивается раньше (on_commit выполняются по порядку), update() её уже видит
+    authors.bump()
+    transaction.on_commit(lambda: authors.update(instance.pk, instance.name))
+
+
+@receiver(post_delete, sender=Author)
+def remove_author(sender, instance, **kwargs):
+    pk = instance.pk
+    authors.bump()
+    transaction.on_commit(lambda: authors.update(pk))
@@ -0,0 +1,117 @@
+import io
+import json
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Заголовки родительского запроса, которые получает каждый подзапрос
+INHERITED_META = ('HTTP_AUTHORIZATION', 'HTTP_HOST', 'HTTP_ACCEPT_LANGUAGE', 'HTTP_USER_AGENT',
+                  'REMOTE_ADDR', 'SERVER_NAME', 'SERVER_PORT', 'SERVER_PROTOCOL')
+RETURNED_HEADERS = ('ETag', 'Last-Modified', 'Location')
+
+
+class BatchView(APIView):
+    """
+    Несколько вызовов API за один HTTP-запрос (POST /api/batch/).
+
+    Тело — список подзапросов:
+        [{"method": "GET", "path": "/api/books/1/"},
+         {"method": "PATCH", "path": "/api/books/2/", "body": {"title": "..."}}]
+
+    Подзапросы выполняются по порядку в этом же процессе через обычные
+    вью (одно соединение с базой, тот же пользователь и сессия), в том числе
+    async-вью.
+    Ответ — список {"status", "headers", "body"} в том же порядке.
+    Потоковый ответ (StreamingHttpResponse) пришлось бы целиком собрать
+    в памяти, поэтому такой подзапрос получает 501.
+    """
+    max_requests = 50
+    allowed_methods = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+    path_prefix = '/api/'
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            return Response({'non_field_errors': ['Expected a list of requests.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.max_requests:
+            return Response({'non_field_errors': [f'No more than {self.max_requests} requests allowed.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response([self.run_subrequest(request, item) for item in request.data])
+
+    def run_subrequest(self, request, item):
+        if not isinstance(item, dict):
+            return self.error(status.HTTP_400_BAD_REQUEST, 'Expected an object with "method" and "path".')
+        method = str(item.get('method', 'GET')).upper()
+        path = str(item.get('path', ''))
+        if method not in self.allowed_methods:
+            return self.error(status.HTTP_405_METHOD_NOT_ALLOWED, f'Method "{method}" not allowed.')
+        path_info, _, query_string = path.partition('?')
+        if not path_info.startswith(self.path_prefix) or path_info.rstrip('/') == request.path.rstrip('/'):
+            return self.error(status.HTTP_400_BAD_REQUEST, f'Path "{path}" cannot be batched.')
+
+        try:
+            match = resolve(path_info)
+        except Resolver404:
+            return self.error(status.HTTP_404_NOT_FOUND, 'Not found.')
+
+        view = match.func
+        if iscoroutinefunction(view):
+            # async-вью (/api/async/...): ждём результат здесь же, ORM выполнится в этом потоке
+            view = async_to_sync(view)
+        subrequest = self.build_subrequest(request, method, path_info, query_string, item.get('body'))
+        try:
+            response = view(subrequest, *match.args, **match.kwargs)
+        except Http404:
+            return self.error(status.HTTP_404_NOT_FOUND, 'Not found.')
+        if response.streaming:
+            # генератор не читаем: закрытие освобождает курсор базы
+            response.close()
+            return self.error(status.HTTP_501_NOT_IMPLEMENTED, 'Streaming responses cannot be batched.')
+        if hasattr(response, 'render'):
+            response.render()
+        return {
+            'status': response.status_code,
+            'headers': {name: response[name] for name in RETURNED_HEADERS if response.has_header(name)},
+            'body': self.decode_body(response),
+        }
+
+    def build_subrequest(self, request, method, path_info, query_string, body):
+        content = b'' if body is None else json.dumps(body).encode()
+        environ = {name: request.META[name] for name in INHERITED_META if name in request.META}
+        environ.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path_info,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': query_string,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(content)),
+            'HTTP_ACCEPT': 'application/json',
+            'wsgi.input': io.BytesIO(content),
+            'wsgi.url_scheme': request.scheme,
+        })
+        subrequest = WSGIRequest(environ)
+        # Контекст аутентификации родительского запроса
+        subrequest.user = request.user
+        subrequest.session = getattr(request._request, 'session', None)
+        subrequest.COOKIES = request.COOKIES
+        # CSRF уже проверен для самого batch-запроса
+        subrequest._dont_enforce_csrf_checks = True
+        return subrequest
+
+    @staticmethod
+    def decode_body(response):
+        content = response.content
+        if not content:
+            return None
+        if response.get('Content-Type', '').startswith('application/json'):
+            return json.loads(content)
+        return content.decode(response.charset)
+
+    @staticmethod
+    def error(status_code, detail):
+        return {'status': status_code, 'headers': {}, 'body': {'detail': detail}}
@@ -0,0 +1,93 @@
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .models import ModelVersion
+
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Content-Disposition', 'Vary')
+
+
+def get_auth_scope(request):
+    """Кому принадлежит ответ: пользователь, заголовок Authorization и CSRF-cookie."""
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else 'anon'
+    return '|'.join([
+        str(user_id),
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        # HTML-страницы содержат CSRF-токен, привязанный к этой cookie
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ])
+
+
+def get_cache_key(request, model_classes):
+    stamps = ModelVersion.get_stamps(*model_classes)
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    key = '|'.join([
+        request.method,
+        request.path,
+        query,
+        get_auth_scope(request),
+        request.META.get('HTTP_ACCEPT', ''),
+        ModelVersion.format_stamps(stamps),
+    ])
+    return 'response:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def cache_response(*model_classes, timeout=DEFAULT_TIMEOUT):
+    """
+    Кэширует GET-ответ вью, помечая его "тегами" — моделями, которые он читает.
+
+    Версии моделей (ModelVersion) входят в ключ, а сигналы post_save /
+    post_delete / m2m_changed их увеличивают, поэтому изменение данных
+    инвалидирует ровно те ответы, которые от них зависят.
+    Версии лежат в базе, так что инвалидация видна всем процессам;
+    сами ответы хранятся в кэше settings.RESPONSE_CACHE_ALIAS
+    (LocMemCache — в памяти процесса, FileBasedCache — общий на диске).
+
+    Применяется к dispatch() (method_decorator(..., name='dispatch')) или к функции-вью.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return view_func(request, *args, **kwargs)
+
+            cache = caches[settings.RESPONSE_CACHE_ALIAS]
+            key = get_cache_key(request, model_classes)
+            cached = cache.get(key)
+            if cached is not None:
+                status, content, headers = cached
+                not_modified = get_conditional_response(
+                    request, etag=headers.get('ETag'),
+                    last_modified=parse_http_date_safe(headers.get('Last-Modified', '')))
+                if not_modified is not None:
+                    return not_modified
+                response = HttpResponse(content, status=status)
+                for name, value in headers.items():
+                    response[name] = value
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming or response.cookies:
+                return response
+
+            def store(response):
+                headers = {name: response[name] for name in ('Content-Type', *CACHED_HEADERS)
+                           if response.has_header(name)}
+                cache.set(key, (response.status_code, response.content, headers), timeout)
+
+            if getattr(response, 'is_rendered', True):
+                store(response)
+            else:
+                response.add_post_render_callback(store)
+            return response
+        return inner
+    return decorator
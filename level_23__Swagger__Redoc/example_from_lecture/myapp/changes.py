@@ -0,0 +1,97 @@
+import base64
+import binascii
+import json
+from collections import defaultdict
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Author, Book, Genre, Tombstone
+
+# Потоки ленты: ключ в токене -> (модель, поля строки)
+STREAMS = {
+    'b': (Book, ['id', 'title', 'year_published', 'author_id', 'is_deleted']),
+    'a': (Author, ['id', 'name']),
+    'g': (Genre, ['id', 'name']),
+    't': (Tombstone, ['label', 'object_id']),
+}
+START = [-1, 0]
+
+
+def encode_token(cursors):
+    raw = json.dumps(cursors, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    if not token:
+        return {key: START for key in STREAMS}
+    try:
+        cursors = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if set(cursors) != set(STREAMS) or not all(
+                isinstance(value, list) and len(value) == 2 and all(isinstance(x, int) for x in value)
+                for value in cursors.values()):
+            raise ValueError
+    except (TypeError, ValueError, binascii.Error):
+        raise ValidationError({'since': ['Invalid change token.']})
+    return cursors
+
+
+def read_changes(token, limit):
+    """
+    Изменения книг, авторов и жанров после токена `token`.
+
+    Каждый поток читается keyset-запросом по индексу (change_seq, id),
+    поэтому после пары правок передаётся пара строк, а не вся таблица.
+    Мягко удалённые книги (is_deleted) и физически удалённые строки
+    (Tombstone) попадают в "deleted".
+    """
+    cursors = decode_token(token)
+    rows = {}
+    has_more = False
+    for key, (model, fields) in STREAMS.items():
+        seq, pk = cursors[key]
+        page = list(
+            model._base_manager
+            .filter(Q(change_seq__gt=seq) | Q(change_seq=seq, id__gt=pk))
+            .order_by('change_seq', 'id')
+            .values('change_seq', 'id', *fields)[:limit + 1]
+        )
+        if len(page) > limit:
+            has_more = True
+            page = page[:limit]
+        if page:
+            cursors[key] = [page[-1]['change_seq'], page[-1]['id']]
+        rows[key] = page
+
+    deleted = defaultdict(list)
+    for row in rows['t']:
+        deleted[row['label'].split('.')[-1]].append(row['object_id'])
+
+    books = []
+    for row in rows['b']:
+        if row['is_deleted']:
+            deleted['book'].append(row['id'])
+        else:
+            books.append(row)
+    genre_ids = defaultdict(list)
+    for book_id, genre_id in Genre.books.through.objects.filter(
+            book_id__in=[row['id'] for row in books]).values_list('book_id', 'genre_id'):
+        genre_ids[book_id].append(genre_id)
+
+    return {
+        'books': [
+            {'id': row['id'], 'title': row['title'], 'year_published': row['year_published'],
+             'author': row['author_id'], 'genres': genre_ids[row['id']]}
+            for row in books
+        ],
+        'authors': [{'id': row['id'], 'name': row['name']} for row in rows['a']],
+        'genres': [{'id': row['id'], 'name': row['name']} for row in rows['g']],
+        'deleted': {
+            'books': deleted['book'],
+            'authors': deleted['author'],
+            'genres': deleted['genre'],
+        },
+        'next_token': encode_token(cursors),
+        'has_more': has_more,
+    }
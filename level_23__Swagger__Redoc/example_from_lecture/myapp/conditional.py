@@ -0,0 +1,51 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .models import ModelVersion
+
+
+def _get_stamps(request, model_classes):
+    # etag_func и last_modified_func вызываются для одного запроса дважды —
+    # версии читаются из базы только один раз
+    if not hasattr(request, '_model_stamps'):
+        request._model_stamps = ModelVersion.get_stamps(*model_classes)
+    return request._model_stamps
+
+
+def conditional_view(*model_classes):
+    """
+    Декоратор метода вьюсета: строгий ETag и Last-Modified по версиям
+    моделей `model_classes`.
+
+    Если версии не изменились, на If-None-Match / If-Modified-Since
+    сразу возвращается 304 — без запроса списка и без сериализации.
+    """
+    def etag(request, *args, **kwargs):
+        stamps = _get_stamps(request, model_classes)
+        key = '|'.join([
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            ModelVersion.format_stamps(stamps),
+        ])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        stamps = _get_stamps(request, model_classes)
+        return max((modified for _, modified in stamps.values() if modified), default=None)
+
+    def decorator(func):
+        conditional_func = condition(etag_func=etag, last_modified_func=last_modified)(func)
+
+        @wraps(func)
+        def inner(request, *args, **kwargs):
+            response = conditional_func(request, *args, **kwargs)
+            # ETag зависит от Accept (JSON / Browsable API)
+            patch_vary_headers(response, ('Accept',))
+            return response
+        return inner
+
+    return method_decorator(decorator)
@@ -0,0 +1,143 @@
+"""
+Счётчики живых (не удалённых) книг Author.books_count и Genre.books_count.
+
+Хранятся в самих строках автора и жанра, поэтому список авторов читает
+число книг без JOIN и COUNT. Обновляются атомарно (UPDATE ... SET
+books_count = books_count + n) обработчиками сигналов ниже: создание,
+удаление и мягкое удаление/восстановление книги, смена автора, изменение
+Genre.books. Массовые операции без сигналов (bulk_create, bulk_update)
+вызывают apply_book_changes сами.
+
+Расхождения (например, после raw SQL) находит и исправляет
+manage.py verify_books_count [--repair].
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Author, Book, Genre, ModelVersion
+
+BookGenre = Genre.books.through
+
+
+def book_state(book):
+    """(автор, учитывается ли книга в счётчиках)."""
+    return book.author_id, not book.is_deleted
+
+
+def apply_book_changes(changes):
+    """
+    changes — [(pk книги, состояние до, состояние после)], состояние — book_state()
+    или None (книги не было / больше нет). Жанры книги читаются из базы, поэтому
+    при удалении вызывать до удаления связей.
+    """
+    authors = Counter()
+    toggled = {}
+    for pk, before, after in changes:
+        if before and before[1]:
+            authors[before[0]] -= 1
+        if after and after[1]:
+            authors[after[0]] += 1
+        delta = bool(after and after[1]) - bool(before and before[1])
+        if delta:
+            toggled[pk] = delta
+
+    genres = Counter()
+    if toggled:
+        for book_id, genre_id in BookGenre.objects.filter(book_id__in=toggled).values_list('book_id', 'genre_id'):
+            genres[genre_id] += toggled[book_id]
+    add_counts(Author, authors)
+    add_counts(Genre, genres)
+
+
+def add_counts(model, deltas):
+    """Прибавляет к books_count: один UPDATE на каждую разную величину изменения."""
+    pks_by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            pks_by_delta[delta].append(pk)
+    for delta, pks in pks_by_delta.items():
+        model.objects.filter(pk__in=pks).update(books_count=F('books_count') + delta)
+    if pks_by_delta:
+        # update() не отправляет сигналов, а счётчик виден в кэшируемых ответах
+        ModelVersion.bump(model)
+
+
+def _counted_fields_saved(raw, update_fields):
+    return not raw and (update_fields is None or bool(update_fields & {'author', 'author_id', 'is_deleted'}))
+
+
+@receiver(pre_save, sender=Book)
+def remember_book_state(sender, instance, raw, using, update_fields, **kwargs):
+    if not _counted_fields_saved(raw, update_fields):
+        return
+    instance._counted_state = None
+    if not instance._state.adding:
+        row = Book.all_objects.using(using).filter(pk=instance.pk).values_list('author_id', 'is_deleted').first()
+        instance._counted_state = row and (row[0], not row[1])
+
+
+@receiver(post_save, sender=Book)
+def count_saved_book(sender, instance, raw, update_fields, **kwargs):
+    if not _counted_fields_saved(raw, update_fields):
+        return
+    before, after = instance.__dict__.pop('_counted_state', None), book_state(instance)
+    if before != after:
+        apply_book_changes([(instance.pk, before, after)])
+
+
+@receiver(pre_delete, sender=Book)
+def count_deleted_book(sender, instance, **kwargs):
+    # до удаления: связи с жанрами ещё на месте
+    apply_book_changes([(instance.pk, book_state(instance), None)])
+
+
+@receiver(m2m_changed, sender=BookGenre)
+def count_genre_books(sender, instance, action, reverse, pk_set, **kwargs):
+    # post_add получает только действительно добавленные связи, а remove —
+    # всё, что передали, поэтому удаляемые связи считаются по базе заранее
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    links = BookGenre.objects.filter(book__is_deleted=False)
+    if reverse:
+        # book.genres.add(...)
+        links = links.filter(book_id=instance.pk)
+        if action != 'pre_clear':
+            links = links.filter(genre_id__in=pk_set)
+    else:
+        # genre.books.add(...)
+        links = links.filter(genre_id=instance.pk)
+        if action != 'pre_clear':
+            links = links.filter(book_id__in=pk_set)
+    sign = 1 if action == 'post_add' else -1
+    counts = links.order_by().values_list('genre_id').annotate(count=Count('pk'))
+    add_counts(Genre, {genre_id: sign * count for genre_id, count in counts})
+
+
+def actual_count(model):
+    """Выражение: настоящее число живых книг автора или жанра (для annotate / update)."""
+    if model is Author:
+        books = Book.objects.filter(author=OuterRef('pk')).values('author')
+    else:
+        books = BookGenre.objects.filter(genre=OuterRef('pk'), book__is_deleted=False).values('genre')
+    return Coalesce(Subquery(books.order_by().annotate(count=Count('pk')).values('count')), Value(0))
+
+
+def find_drift(model, pks):
+    """[(pk, записанное значение, настоящее)] для строк `pks`, где счётчик разошёлся."""
+    return list(
+        model.objects.filter(pk__in=pks)
+        .annotate(actual=actual_count(model))
+        .exclude(books_count=F('actual'))
+        .order_by('pk')
+        .values_list('pk', 'books_count', 'actual')
+    )
+
+
+def repair(model, pks):
+    # одно выражение UPDATE: параллельные F()-обновления не теряются
+    model.objects.filter(pk__in=pks).update(books_count=actual_count(model))
+    ModelVersion.bump(model)
@@ -0,0 +1,125 @@
+from django.db import models
+from rest_framework import serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+
+from .timing import measure
+
+# Пары (поле DRF, поле модели), для которых to_representation() не меняет
+# значение, уже полученное из базы через values()
+IDENTITY_FIELDS = (
+    (serializers.IntegerField, models.IntegerField),
+    (serializers.CharField, (models.CharField, models.TextField)),
+)
+
+
+class ValuesPlan:
+    """
+    Заранее "скомпилированный" план сериализации из values().
+
+    Для каждого поля сериализатора хранит имя в ответе, колонку в values()
+    и функцию преобразования (None — значение отдаётся как есть).
+    Результат совпадает с обычным to_representation() побайтно.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns  # [(name, column, converter), ...]
+
+    @property
+    def values_fields(self):
+        return [column for _, column, _ in self.columns]
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, converter in self.columns:
+            value = row[column]
+            if converter is not None and value is not None:
+                value = converter(value)
+            data[name] = value
+        return data
+
+    @classmethod
+    def compile(cls, serializer):
+        """Строит план по сериализатору или возвращает None, если это невозможно."""
+        opts = serializer.Meta.model._meta
+        columns = []
+        for field in serializer._readable_fields:
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField,
+                                  serializers.ManyRelatedField)):
+                return None
+            if len(field.source_attrs) != 1:
+                return None
+            try:
+                model_field = opts.get_field(field.source_attrs[0])
+            except LookupError:
+                return None
+            if not model_field.concrete:
+                return None
+
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                if field.pk_field is not None or not model_field.many_to_one:
+                    return None
+                columns.append((field.field_name, model_field.attname, None))
+            elif isinstance(field, serializers.RelatedField) or model_field.is_relation:
+                return None
+            elif any(isinstance(field, field_class) and isinstance(model_field, model_class)
+                     for field_class, model_class in IDENTITY_FIELDS):
+                columns.append((field.field_name, model_field.attname, None))
+            else:
+                columns.append((field.field_name, model_field.attname, field.to_representation))
+        return cls(columns)
+
+
+class ValuesReadMixin:
+    """
+    Быстрый путь list / retrieve для ModelViewSet: строки читаются через
+    values() и сериализуются по ValuesPlan, без создания экземпляров модели
+    и обхода полей DRF на каждой строке.
+
+    Если сериализатор содержит вложенные или вычисляемые поля,
+    используется обычный путь.
+    """
+    values_read = True
+
+    def get_values_plan(self):
+        if not self.values_read:
+            return None
+        return ValuesPlan.compile(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_values_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = [field.lstrip('-') for field in getattr(self.paginator, 'ordering', ())]
+        rows = queryset.values(*dict.fromkeys(plan.values_fields + ordering))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            with measure('serialize'):
+                data = [plan.to_representation(row) for row in page]
+            return self.get_paginated_response(data)
+        rows = list(rows)
+        with measure('serialize'):
+            data = [plan.to_representation(row) for row in rows]
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        plan = self.get_values_plan()
+        # Объектные права проверяются на экземпляре модели — тогда только обычный путь
+        if plan is None or any(
+                type(permission).has_object_permission is not BasePermission.has_object_permission
+                for permission in self.get_permissions()):
+            return super().retrieve(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        # get_object_or_404 из DRF: некорректный pk ('abc') — 404, а не 500
+        row = get_object_or_404(
+            queryset.values(*plan.values_fields),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        with measure('serialize'):
+            data = plan.to_representation(row)
+        return Response(data)
@@ -1,9 +1,53 @@
 from django import forms
+from django.urls import reverse_lazy
 from .models import Author, Book, BookDetail
 from django.forms import inlineformset_factory, modelformset_factory
 
 
+class AutocompleteSelect(forms.Select):
+    """
+    Select для ModelChoiceField, в разметке которого только выбранный объект.
+    Остальные варианты подгружаются скриптом по мере ввода из data-autocomplete-url,
+    поэтому форма не выгружает в страницу всю таблицу.
+    """
+    class Media:
+        js = ['myapp/js/autocomplete_select.js']
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        # {pk: подпись} уже загруженных объектов — для них запрос не нужен
+        self.known = {}
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = str(self.url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        # вместо перебора всего queryset — пустой вариант и выбранные значения
+        iterator = self.choices
+        selected = [str(pk) for pk in value if str(pk).isdigit()]
+        known = [(pk, label) for pk, label in self.known.items() if str(pk) in selected]
+        missing = set(selected) - {str(pk) for pk, _ in known}
+        if missing:
+            known += [(obj.pk, iterator.field.label_from_instance(obj))
+                      for obj in iterator.queryset.filter(pk__in=missing)]
+        self.choices = [('', iterator.field.empty_label or '')] + known
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
+
+
 class BookForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # автор, загруженный вместе с книгой (select_related), не запрашивается виджетом повторно
+        if Book.author.is_cached(self.instance):
+            author = self.instance.author
+            self.fields['author'].widget.known = {author.pk: str(author)}
+
     class Meta:
         model = Book
         fields = ['title', 'author', 'year_published', 'is_deleted']
@@ -11,7 +55,7 @@ class BookForm(forms.ModelForm):
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'year_published': forms.NumberInput(attrs={'class': 'form-control'}),
             'is_deleted': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
-            'author': forms.Select(attrs={'class': 'form-select'}),
+            'author': AutocompleteSelect(reverse_lazy('author-autocomplete'), attrs={'class': 'form-select'}),
             # 'author': forms.RadioSelect(),
 
         }
@@ -0,0 +1,162 @@
+"""
+Нечёткий поиск по именам авторов и названиям книг ("Дестаевский" -> "Достоевский").
+
+Строки разбиваются на триграммы как в pg_trgm (каждое слово дополняется
+пробелами: "  д", " до", "дос", ...), схожесть — доля общих триграмм
+(коэффициент Жаккара). Триграммы хранятся в таблице Trigram с индексом
+по (gram, kind, object_id) и обновляются сигналами при сохранении и удалении.
+
+Кандидаты выбираются запросом к индексу только по самым редким триграммам
+запроса: объекту со схожестью >= threshold нужно иметь хотя бы одну из них,
+поэтому частые триграммы не читаются. Результат приблизительный: точная
+схожесть считается только для CANDIDATES объектов с наибольшим числом общих
+редких триграмм, и на большой таблице близкое совпадение может не попасть
+в их число. Время ответа при этом не зависит от размера таблицы.
+Схожесть считается и с фрагментами текста (см. text_similarity): запрос
+по фамилии находит автора, записанного с именем.
+"""
+import math
+import re
+
+from django.db import connection
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Author, Book, Trigram
+
+THRESHOLD = 0.3
+# сколько объектов-кандидатов проверяется точной схожестью (см. docstring модуля)
+CANDIDATES = 200
+CHUNK_SIZE = 1000
+# kind -> (модель, поле с текстом, условие "объект в индексе")
+SOURCES = {
+    'a': (Author, 'name', {}),
+    'b': (Book, 'title', {'is_deleted': False}),
+}
+TYPES = {'a': 'author', 'b': 'book'}
+INSERT_TRIGRAM = (
+    f'INSERT INTO {connection.ops.quote_name(Trigram._meta.db_table)} (gram, kind, object_id) '
+    'VALUES (%s, %s, %s)'
+)
+
+
+def words(text):
+    return re.findall(r'\w+', (text or '').lower().replace('ё', 'е'))
+
+
+def trigrams(text):
+    grams = set()
+    for word in words(text):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(left, right):
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared) if shared else 0.0
+
+
+def text_similarity(query, query_grams, text):
+    """
+    Схожесть запроса с текстом или с его фрагментом из стольких же слов:
+    "Дестаевский" близко к "Фёдор Достоевский", хотя имя в запросе не указано.
+    """
+    text_words = words(text)
+    size = len(words(query))
+    spans = [' '.join(text_words[i:i + size]) for i in range(max(len(text_words) - size, 0) + 1)]
+    return max(similarity(query_grams, trigrams(span)) for span in [text, *spans])
+
+
+def index_objects(kind, object_ids):
+    """Переиндексирует объекты; удалённые (и мягко удалённые книги) убираются из индекса."""
+    model, field, condition = SOURCES[kind]
+    object_ids = list(object_ids)
+    for start in range(0, len(object_ids), CHUNK_SIZE):
+        chunk = object_ids[start:start + CHUNK_SIZE]
+        Trigram.objects.filter(kind=kind, object_id__in=chunk).delete()
+        rows = [
+            (gram, kind, pk)
+            for pk, text in model._base_manager.filter(pk__in=chunk, **condition).values_list('pk', field)
+            for gram in trigrams(text)
+        ]
+        # десятки строк на объект: executemany без создания моделей в разы быстрее bulk_create
+        with connection.cursor() as cursor:
+            cursor.executemany(INSERT_TRIGRAM, rows)
+
+
+def unindex_objects(kind, object_ids):
+    """Убирает удалённые объекты из индекса."""
+    object_ids = list(object_ids)
+    for start in range(0, len(object_ids), CHUNK_SIZE):
+        Trigram.objects.filter(kind=kind, object_id__in=object_ids[start:start + CHUNK_SIZE]).delete()
+
+
+def rebuild_index():
+    Trigram.objects.all().delete()
+    count = 0
+    for kind, (model, _, condition) in SOURCES.items():
+        object_ids = list(model._base_manager.filter(**condition).values_list('pk', flat=True).order_by('pk'))
+        index_objects(kind, object_ids)
+        count += len(object_ids)
+    return count
+
+
+def suggest(query, limit=10, kinds=('a', 'b'), threshold=THRESHOLD):
+    """
+    Похожие авторы и книги: [{"type", "id", "text", "similarity"}] по убыванию схожести.
+    Проверяются не больше CANDIDATES кандидатов, поэтому список может быть неполным.
+    """
+    query_grams = trigrams(query)
+    if not query_grams:
+        return []
+    frequency = dict(
+        Trigram.objects.filter(gram__in=query_grams, kind__in=kinds)
+        .values_list('gram').annotate(count=Count('id'))
+    )
+    # общих триграмм должно быть не меньше threshold * |запрос|
+    probe_size = len(query_grams) - math.ceil(threshold * len(query_grams)) + 1
+    probe = sorted(frequency, key=frequency.get)[:probe_size]
+    if not probe:
+        return []
+    candidates = (
+        Trigram.objects.filter(gram__in=probe, kind__in=kinds)
+        .values_list('kind', 'object_id').annotate(shared=Count('id'))
+        .order_by('-shared')[:CANDIDATES]
+    )
+    ids = {}
+    for kind, object_id, _ in candidates:
+        ids.setdefault(kind, []).append(object_id)
+
+    results = []
+    for kind, object_ids in ids.items():
+        model, field, condition = SOURCES[kind]
+        for pk, text in model._base_manager.filter(pk__in=object_ids, **condition).values_list('pk', field):
+            score = text_similarity(query, query_grams, text)
+            if score >= threshold:
+                results.append({'type': TYPES[kind], 'id': pk, 'text': text, 'similarity': round(score, 4)})
+    results.sort(key=lambda item: (-item['similarity'], item['text']))
+    return results[:limit]
+
+
+def _changed(update_fields, *fields):
+    return update_fields is None or bool(set(fields) & set(update_fields))
+
+
+@receiver(post_save, sender=Author)
+def index_author(sender, instance, update_fields, **kwargs):
+    if _changed(update_fields, 'name'):
+        index_objects('a', [instance.pk])
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, update_fields, **kwargs):
+    if _changed(update_fields, 'title', 'is_deleted'):
+        index_objects('b', [instance.pk])
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Book)
+def remove_from_index(sender, instance, **kwargs):
+    unindex_objects('a' if sender is Author else 'b', [instance.pk])
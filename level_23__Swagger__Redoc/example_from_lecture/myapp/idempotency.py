@@ -0,0 +1,122 @@
+"""
+Заголовок Idempotency-Key для изменяющих запросов API (POST/PUT/PATCH/DELETE).
+
+Клиент, повторяющий запрос после таймаута, передаёт тот же ключ — и получает
+сохранённый ответ первого запроса вместо повторного создания книги.
+
+Записи лежат в кэше settings.IDEMPOTENCY_CACHE_ALIAS: его TIMEOUT — время жизни
+ключа, MAX_ENTRIES — ограничение размера. Первый запрос атомарно (cache.add)
+ставит отметку "выполняется"; повтор, пришедший в это время, ждёт ответа
+первого (до IDEMPOTENCY_WAIT_TIMEOUT секунд), а не выполняется ещё раз.
+Ключ привязан к пользователю и "отпечатку" запроса (метод, путь, тело):
+тот же ключ с другим запросом — ошибка 422.
+
+Ответы 5xx и исключения не сохраняются — такой запрос можно повторить.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+from .cache import get_auth_scope
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+STORED_HEADERS = ('Content-Type', 'Location', 'ETag', 'Last-Modified')
+PENDING = 'pending'
+DONE = 'done'
+
+
+def get_fingerprint(request):
+    key = '|'.join([request.method, request.get_full_path(), request.content_type or ''])
+    return hashlib.sha256(key.encode() + b'|' + request.body).hexdigest()
+
+
+def get_store_key(request, idempotency_key):
+    key = '|'.join([get_auth_scope(request), idempotency_key])
+    return 'idempotency:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def replay(entry):
+    _, status, content, headers = entry
+    response = HttpResponse(content, status=status)
+    for name, value in headers.items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def wait_for_response(cache, key, entry):
+    """
+    Ждёт, пока первый запрос с тем же ключом сохранит ответ. Возвращает запись:
+    ответ, None (первый запрос завершился ошибкой) или PENDING (не дождались).
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    delay = 0.01
+    while entry is not None and entry[0] == PENDING and time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
+        entry = cache.get(key)
+    return entry
+
+
+def idempotent(view_func):
+    """
+    Декоратор dispatch() вьюсета (method_decorator(idempotent, name='dispatch')):
+    изменяющие запросы с заголовком Idempotency-Key выполняются не больше одного раза.
+    """
+    @wraps(view_func)
+    def inner(request, *args, **kwargs):
+        idempotency_key = request.headers.get(HEADER)
+        if request.method not in METHODS or idempotency_key is None:
+            return view_func(request, *args, **kwargs)
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            return error(400, f'{HEADER} must be 1-{MAX_KEY_LENGTH} characters long.')
+
+        cache = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        key = get_store_key(request, idempotency_key)
+        fingerprint = get_fingerprint(request)
+
+        # отметка "выполняется" живёт дольше ожидания повторов, но не вечно —
+        # на случай, если процесс упал, не сохранив ответ
+        pending_timeout = settings.IDEMPOTENCY_WAIT_TIMEOUT * 3
+        while not cache.add(key, (PENDING, fingerprint), pending_timeout):
+            entry = cache.get(key)
+            if entry is not None and entry[1] == fingerprint:
+                entry = wait_for_response(cache, key, entry)
+            if entry is None:
+                # первый запрос не удался (или запись истекла) — пробуем выполнить сами
+                continue
+            if entry[1] != fingerprint:
+                return error(422, f'{HEADER} was already used for a different request.')
+            if entry[0] == PENDING:
+                return error(409, f'A request with this {HEADER} is still being processed.')
+            return replay(entry[1:])
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except BaseException:
+            cache.delete(key)
+            raise
+
+        def store(response):
+            if response.status_code >= 500 or response.streaming:
+                cache.delete(key)
+                return
+            headers = {name: response[name] for name in STORED_HEADERS if response.has_header(name)}
+            cache.set(key, (DONE, fingerprint, response.status_code, response.content, headers))
+
+        if getattr(response, 'is_rendered', True):
+            store(response)
+        else:
+            response.add_post_render_callback(store)
+        return response
+    return inner
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from myapp.fastread import ValuesPlan
+from myapp.models import Author, Book
+from myapp.serializers import BookSerializer
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает сериализацию списка книг через BookSerializer и через '
+            'ValuesPlan (values()). Тестовые данные создаются во временной транзакции '
+            'и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with transaction.atomic():
+            author = Author.objects.create(name='bench_fast_read author')
+            Book.objects.bulk_create(
+                [Book(author=author, title=f'Book {i}', year_published=1900 + i % 120)
+                 for i in range(rows)],
+                batch_size=1000)
+            queryset = Book.objects.filter(author=author).order_by('id')
+
+            renderer = JSONRenderer()
+
+            def model_path():
+                return renderer.render(BookSerializer(queryset, many=True).data)
+
+            plan = ValuesPlan.compile(BookSerializer())
+
+            def values_path():
+                return renderer.render(
+                    [plan.to_representation(row) for row in queryset.values(*plan.values_fields)])
+
+            if model_path() != values_path():
+                self.stderr.write(self.style.ERROR('Outputs differ!'))
+                transaction.set_rollback(True)
+                return
+
+            model_time = self.measure(model_path, repeat)
+            values_time = self.measure(values_path, repeat)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'rows: {rows}, best of {repeat}, output is byte-identical')
+        self.stdout.write(f'  ModelSerializer: {model_time * 1000:8.1f} ms')
+        self.stdout.write(f'  ValuesPlan:      {values_time * 1000:8.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'  speedup: x{model_time / values_time:.1f}'))
+
+    @staticmethod
+    def measure(func, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: N одновременных keep-alive соединений на каждый URL, '
+        'выводит пропускную способность и задержки p50/p99.\n'
+        'Пример сравнения WSGI и ASGI:\n'
+        '  gunicorn main.wsgi:application -w 4 --threads 8 -b 127.0.0.1:8001\n'
+        '  uvicorn main.asgi:application --workers 4 --port 8002\n'
+        '  python manage.py bench_http http://127.0.0.1:8001/api/books/ '
+        'http://127.0.0.1:8002/api/async/books/ -c 1000 -n 20000'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument('-c', '--concurrency', type=int, default=1000)
+        parser.add_argument('-n', '--requests', type=int, default=20000)
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        for url in options['urls']:
+            parts = urlsplit(url)
+            if parts.scheme != 'http' or not parts.hostname:
+                raise CommandError(f'Only http:// URLs are supported: {url}')
+            result = asyncio.run(run_benchmark(
+                parts, options['concurrency'], options['requests'], options['timeout']))
+            self.report(url, options['concurrency'], result)
+
+    def report(self, url, concurrency, result):
+        latencies, errors, elapsed = result
+        latencies.sort()
+        self.stdout.write(self.style.SUCCESS(url))
+        self.stdout.write(f'  connections: {concurrency}, ok: {len(latencies)}, errors: {errors}')
+        if not latencies:
+            return
+        self.stdout.write(f'  throughput:  {len(latencies) / elapsed:10.1f} req/s')
+        self.stdout.write(f'  p50:         {percentile(latencies, 50) * 1000:10.1f} ms')
+        self.stdout.write(f'  p99:         {percentile(latencies, 99) * 1000:10.1f} ms')
+        self.stdout.write(f'  max:         {latencies[-1] * 1000:10.1f} ms')
+
+
+def percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+async def run_benchmark(parts, concurrency, total, timeout):
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    request = (f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+               f'Accept: application/json\r\nConnection: keep-alive\r\n\r\n').encode()
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        reader = writer = None
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(parts.hostname, parts.port or 80), timeout)
+                writer.write(request)
+                status, keep_alive = await asyncio.wait_for(read_response(reader), timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                errors += 1
+                writer = close(writer)
+                continue
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+            if not keep_alive:
+                writer = close(writer)
+        close(writer)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def read_response(reader):
+    """Читает один HTTP/1.1 ответ, возвращает (статус, можно ли переиспользовать соединение)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    status = int(status_line.split()[1])
+    headers = {}
+    for line in header_lines:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection') != 'close'
+
+
+def close(writer):
+    if writer is not None:
+        writer.close()
+    return None
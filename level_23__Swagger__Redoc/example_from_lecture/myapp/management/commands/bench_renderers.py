@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from myapp import renderers
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время кодирования и размер страницы книг (1k / 10k объектов) '
+            'для JSONRenderer DRF, FastJSONRenderer (orjson), MessagePack и CBOR.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        candidates = [('DRF JSONRenderer', JSONRenderer())]
+        candidates.append(('FastJSONRenderer' + ('' if renderers.orjson else ' (no orjson)'),
+                           renderers.FastJSONRenderer()))
+        if renderers.msgpack:
+            candidates.append(('MessagePackRenderer', renderers.MessagePackRenderer()))
+        if renderers.cbor2:
+            candidates.append(('CBORRenderer', renderers.CBORRenderer()))
+
+        for size in options['sizes']:
+            data = {
+                'next': 'http://testserver/api/books/?cursor=eyJ2IjpbMTk5OSw0Ml19',
+                'previous': None,
+                'results': [
+                    {'id': i, 'title': f'Война и мир, том {i}', 'year_published': 1800 + i % 200,
+                     'author': i % 500}
+                    for i in range(size)
+                ],
+            }
+            self.stdout.write(self.style.SUCCESS(f'{size} books, best of {options["repeat"]}'))
+            baseline = None
+            for name, renderer in candidates:
+                payload = renderer.render(data, renderer.media_type, {})
+                best = float('inf')
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    renderer.render(data, renderer.media_type, {})
+                    best = min(best, time.perf_counter() - start)
+                baseline = baseline or best
+                self.stdout.write(
+                    f'  {name:32} {best * 1000:8.2f} ms  x{baseline / best:5.1f}  {len(payload):>10} bytes')
@@ -0,0 +1,138 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from .bench_http import percentile
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест SQLite: несколько процессов одновременно читают и изменяют '
+            'книги (ORM, с сигналами) во временной копии базы. Сравнивает настройки '
+            'SQLite по умолчанию и settings.SQLITE_OPTIONS (WAL, busy_timeout, BEGIN IMMEDIATE).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('-p', '--processes', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--books', type=int, default=5000)
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='доля операций записи')
+
+    def handle(self, *args, **options):
+        modes = {'default': {}, 'tuned': settings.SQLITE_OPTIONS}
+        with tempfile.TemporaryDirectory() as directory:
+            template = Path(directory) / 'template.sqlite3'
+            self.stdout.write(f'Создаю базу: {options["books"]} книг...')
+            self.create_database(template, options['books'])
+            results = {}
+            for mode, sqlite_options in modes.items():
+                path = Path(directory) / f'{mode}.sqlite3'
+                shutil.copy(template, path)
+                results[mode] = self.run_mode(path, sqlite_options, options)
+                self.report(mode, *results[mode])
+
+        (default_ops, _, _), (tuned_ops, _, _) = results['default'], results['tuned']
+        if default_ops:
+            self.stdout.write(self.style.SUCCESS(f'tuned / default: {tuned_ops / default_ops:.1f}x'))
+
+    def create_database(self, path, books):
+        """Схема и тестовые данные — в отдельном файле, основная база не затрагивается."""
+        saved = dict(connection.settings_dict)
+        connection.close()
+        connection.settings_dict.update(NAME=str(path), OPTIONS={})
+        try:
+            call_command('migrate', verbosity=0, interactive=False)
+            from myapp.models import Author, Book
+            authors = Author.objects.bulk_create([Author(name=f'bench_sqlite {i}') for i in range(100)])
+            Book.objects.bulk_create(
+                [Book(author=authors[i % len(authors)], title=f'Book {i}', year_published=1900 + i % 120)
+                 for i in range(books)],
+                batch_size=1000)
+        finally:
+            connection.close()
+            connection.settings_dict.clear()
+            connection.settings_dict.update(saved)
+
+    def run_mode(self, path, sqlite_options, options):
+        processes = options['processes']
+        # spawn: одинаково на Linux, macOS и Windows; у каждого процесса своё соединение
+        with ProcessPoolExecutor(processes, mp_context=get_context('spawn')) as pool:
+            futures = [pool.submit(run_worker, str(path), sqlite_options, options['seconds'],
+                                   options['write_ratio'], seed)
+                       for seed in range(processes)]
+            results = [future.result() for future in futures]
+        # каждый процесс работает ровно --seconds; запуск процессов (django.setup()) не считается
+        elapsed = options['seconds']
+        reads = sorted(latency for result in results for latency in result['read'])
+        writes = sorted(latency for result in results for latency in result['write'])
+        errors = sum(result['errors'] for result in results)
+        return (len(reads) + len(writes)) / elapsed, (reads, writes, errors), elapsed
+
+    def report(self, mode, ops, latencies, elapsed):
+        reads, writes, errors = latencies
+        self.stdout.write(self.style.SUCCESS(mode))
+        self.stdout.write(f'  throughput:  {ops:10.1f} ops/s ({len(reads)} reads, {len(writes)} writes '
+                          f'in {elapsed:.1f} s)')
+        self.stdout.write(f'  errors:      {errors:10d} (database is locked)')
+        for name, values in (('read', reads), ('write', writes)):
+            if values:
+                self.stdout.write(f'  {name} p50/p99: {percentile(values, 50) * 1000:7.1f} / '
+                                  f'{percentile(values, 99) * 1000:.1f} ms')
+
+
+def run_worker(path, sqlite_options, seconds, write_ratio, seed):
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+    django.setup()
+    from django.db import OperationalError, connection, transaction
+    from myapp.models import Author, Book
+
+    connection.settings_dict.update(NAME=path, OPTIONS=sqlite_options)
+    rng = random.Random(seed)
+    book_pks = list(Book.objects.values_list('pk', flat=True))
+    author_pks = list(Author.objects.values_list('pk', flat=True))
+    created = []
+
+    def read():
+        if rng.random() < 0.5:
+            offset = rng.randrange(len(book_pks))
+            list(Book.objects.select_related('author').order_by('year_published', 'id')[offset:offset + 20])
+        else:
+            Book.objects.select_related('author').get(pk=rng.choice(book_pks))
+
+    def write():
+        # как во вью: прочитать, затем изменить — в одной транзакции
+        with transaction.atomic():
+            action = rng.random()
+            if action < 0.4 or not created:
+                book = Book.objects.create(author_id=rng.choice(author_pks), title='New book',
+                                           year_published=rng.randrange(1900, 2025))
+                created.append(book.pk)
+            elif action < 0.8:
+                book = Book.objects.get(pk=rng.choice(book_pks))
+                book.title = f'Book {rng.randrange(10 ** 6)}'
+                book.save()
+            else:
+                Book.objects.filter(pk=created.pop()).delete()
+
+    result = {'read': [], 'write': [], 'errors': 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        kind, operation = ('write', write) if rng.random() < write_ratio else ('read', read)
+        start = time.perf_counter()
+        try:
+            operation()
+        except OperationalError:
+            result['errors'] += 1
+            continue
+        result[kind].append(time.perf_counter() - start)
+    connection.close()
+    return result
@@ -0,0 +1,228 @@
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from myapp import fuzzy
+from myapp.autocomplete import authors as author_index
+from myapp.counters import add_counts
+from myapp.models import Author, Book, BookDetail, ChangeSequence, Genre, ModelVersion
+from myapp.search import index_books
+
+BookGenre = Genre.books.through
+
+FORMATS = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает книги из файлов JSON (массив), NDJSON или CSV в формате BOOKS_DATA '
+        '(level_09 book_data.py): author, title, year_published, summary, page_count, genres. '
+        'В CSV жанры разделяются "|" (как в /api/books/export/?format=csv).\n'
+        'Файл читается потоком, авторы и жанры ищутся в словарях в памяти, книги, '
+        'аннотации и связи с жанрами пишутся bulk_create пачками, по транзакции на пачку. '
+        'Книги, которые уже есть у автора с тем же названием, пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='файлы; "-" — стандартный ввод')
+        parser.add_argument('--format', choices=sorted(set(FORMATS.values())),
+                            help='формат файлов (по умолчанию — по расширению)')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='книг в одной транзакции')
+        parser.add_argument('--no-index', action='store_true',
+                            help='не обновлять поисковые индексы (потом: manage.py rebuild_search_index)')
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError('Нужна СУБД, возвращающая id из bulk_create (PostgreSQL, SQLite >= 3.35).')
+        self.options = options
+        self.authors = dict(Author.objects.values_list('name', 'pk'))
+        self.genres = dict(Genre.objects.values_list('name', 'pk'))
+        # all_objects: мягко удалённые книги тоже есть, повторный импорт не создаёт их заново
+        self.existing = set(Book.all_objects.values_list('author_id', 'title').iterator())
+        self.stats = Counter()
+        self.start = time.perf_counter()
+
+        for path in options['paths']:
+            rows = self.read_rows(path, options['format'] or self.detect_format(path))
+            while chunk := list(islice(rows, options['chunk_size'])):
+                self.import_chunk(chunk)
+                self.report(path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {self.stats["books"]} книг, {self.stats["authors"]} новых авторов, '
+            f'{self.stats["genres"]} новых жанров за {time.perf_counter() - self.start:.1f} с '
+            f'({self.rate():.0f} строк/с); пропущено: {self.stats["duplicates"]} уже есть, '
+            f'{self.stats["invalid"]} с ошибками'))
+        if options['no_index'] and self.stats['books']:
+            self.stdout.write('Поисковые индексы не обновлялись: python manage.py rebuild_search_index')
+
+    def detect_format(self, path):
+        try:
+            return FORMATS[Path(path).suffix.lower()]
+        except KeyError:
+            raise CommandError(f'Не удалось определить формат {path}: укажите --format.')
+
+    def read_rows(self, path, file_format):
+        """Номер строки и запись (dict) — файл читается потоком, целиком в память не попадает."""
+        file = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            if file_format == 'csv':
+                yield from enumerate(csv.DictReader(file), start=2)
+            elif file_format == 'ndjson':
+                for number, line in enumerate(file, start=1):
+                    if line.strip():
+                        yield number, self.decode(line, path, number)
+            else:
+                yield from enumerate(iter_json_array(file), start=1)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+    def decode(self, line, path, number):
+        try:
+            return json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'{path}:{number}: {error}')
+
+    def import_chunk(self, chunk):
+        books = []
+        for number, row in chunk:
+            try:
+                book = parse_row(row)
+            except ValueError as error:
+                self.stats['invalid'] += 1
+                if self.stats['invalid'] <= 10:
+                    self.stderr.write(f'Запись {number}: {error}')
+                continue
+            books.append(book)
+
+        with transaction.atomic():
+            self.create_missing(Author, self.authors, {book['author'] for book in books}, 'authors')
+            self.create_missing(Genre, self.genres, {name for book in books for name in book['genres']}, 'genres')
+
+            new_books = []
+            for book in books:
+                key = (self.authors[book['author']], book['title'])
+                if key in self.existing:
+                    self.stats['duplicates'] += 1
+                    continue
+                self.existing.add(key)
+                new_books.append(book)
+
+            # bulk_create не отправляет сигналы: номер изменения, версии и счётчики — здесь
+            change_seq = ChangeSequence.next(Book)
+            objects = Book.objects.bulk_create([
+                Book(author_id=self.authors[book['author']], title=book['title'],
+                     year_published=book['year_published'], change_seq=change_seq)
+                for book in new_books
+            ])
+            BookDetail.objects.bulk_create([
+                BookDetail(book_id=obj.pk, summary=book['summary'], page_count=book['page_count'])
+                for obj, book in zip(objects, new_books) if book['summary'] is not None
+            ])
+            links = [BookGenre(book_id=obj.pk, genre_id=self.genres[name])
+                     for obj, book in zip(objects, new_books) for name in book['genres']]
+            BookGenre.objects.bulk_create(links)
+
+            add_counts(Author, Counter(obj.author_id for obj in objects))
+            add_counts(Genre, Counter(link.genre_id for link in links))
+            ModelVersion.bump(Book, BookDetail)
+            if not self.options['no_index']:
+                book_ids = [obj.pk for obj in objects]
+                index_books(book_ids)
+                fuzzy.index_objects('b', book_ids)
+        self.stats['books'] += len(objects)
+
+    def create_missing(self, model, cache, names, stat):
+        missing = sorted(names - cache.keys())
+        if not missing:
+            return
+        change_seq = ChangeSequence.next(model)
+        created = model.objects.bulk_create([model(name=name, change_seq=change_seq) for name in missing])
+        cache.update((obj.name, obj.pk) for obj in created)
+        ModelVersion.bump(model)
+        if model is Author:
+            # индекс автодополнения перестроится по своей версии
+            author_index.bump()
+            if not self.options['no_index']:
+                fuzzy.index_objects('a', [obj.pk for obj in created])
+        self.stats[stat] += len(created)
+
+    def rate(self):
+        processed = self.stats['books'] + self.stats['duplicates'] + self.stats['invalid']
+        return processed / max(time.perf_counter() - self.start, 1e-9)
+
+    def report(self, path):
+        self.stdout.write(f'{path}: {self.stats["books"]} книг, {self.rate():.0f} строк/с')
+
+
+def iter_json_array(file, buffer_size=1 << 20):
+    """Элементы JSON-массива по одному, без загрузки всего файла."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(buffer_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидался JSON-массив.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip()
+        while buffer.startswith(','):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            more = file.read(buffer_size)
+            if not more:
+                raise CommandError('Неожиданный конец JSON-массива.')
+            buffer += more
+            continue
+        if end == len(buffer):
+            # число в конце буфера могло быть прочитано не полностью
+            more = file.read(buffer_size)
+            if more:
+                buffer += more
+                continue
+        yield item
+        buffer = buffer[end:]
+
+
+def parse_row(row):
+    """Проверяет и приводит запись к типам моделей; ValueError — запись с ошибкой."""
+    if not isinstance(row, dict):
+        raise ValueError('ожидался объект')
+    author = str(row.get('author') or '').strip()
+    title = str(row.get('title') or '').strip()
+    if not author or len(author) > Author._meta.get_field('name').max_length:
+        raise ValueError(f'некорректный автор {author!r}')
+    if not title or len(title) > Book._meta.get_field('title').max_length:
+        raise ValueError(f'некорректное название {title!r}')
+    try:
+        year_published = int(row.get('year_published'))
+        page_count = int(row['page_count']) if row.get('page_count') not in (None, '') else 0
+    except (TypeError, ValueError):
+        raise ValueError('год и число страниц должны быть целыми числами')
+
+    genres = row.get('genres') or []
+    if isinstance(genres, str):
+        genres = genres.split('|')
+    genres = list(dict.fromkeys(str(name).strip() for name in genres if str(name).strip()))
+    if any(len(name) > Genre._meta.get_field('name').max_length for name in genres):
+        raise ValueError('слишком длинное название жанра')
+
+    summary = row.get('summary')
+    return {
+        'author': author,
+        'title': title,
+        'year_published': year_published,
+        'summary': None if summary in (None, '') else str(summary),
+        'page_count': page_count,
+        'genres': genres,
+    }
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myapp.models import Book
+from myapp.renderers import dump_ndjson_row
+
+
+class Command(BaseCommand):
+    help = ('Физически удаляет мягко удалённые книги (is_deleted) пачками, каждая '
+            'в своей транзакции — таблица не блокируется надолго. С --archive '
+            'удаляемые книги сначала дописываются в файл NDJSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--archive', metavar='PATH', help='файл NDJSON для архива (дописывается)')
+        parser.add_argument('--dry-run', action='store_true', help='только посчитать книги')
+
+    def handle(self, *args, **options):
+        deleted = Book.all_objects.filter(is_deleted=True)
+        if options['dry_run']:
+            self.stdout.write(f'К удалению: {deleted.count()} книг')
+            return
+
+        start = time.perf_counter()
+        archive = open(options['archive'], 'a', encoding='utf-8') if options['archive'] else None
+        purged = last_pk = 0
+        try:
+            while True:
+                with transaction.atomic():
+                    books = list(
+                        deleted.filter(pk__gt=last_pk)
+                        .select_related('author', 'detail')
+                        .prefetch_related('genres')
+                        .order_by('pk')[:options['chunk_size']]
+                    )
+                    if not books:
+                        break
+                    if archive is not None:
+                        archive.writelines(dump_ndjson_row(self.get_archive_row(book)) for book in books)
+                        archive.flush()
+                    # книгу могли восстановить после чтения пачки — условие проверяется ещё раз
+                    deleted.filter(pk__in=[book.pk for book in books]).delete()
+                purged += len(books)
+                last_pk = books[-1].pk
+                self.stdout.write(f'{purged} книг удалено')
+        finally:
+            if archive is not None:
+                archive.close()
+        self.stdout.write(self.style.SUCCESS(f'Готово: {purged} книг за {time.perf_counter() - start:.1f} с'))
+
+    def get_archive_row(self, book):
+        detail = getattr(book, 'detail', None)
+        return {
+            'id': book.id,
+            'title': book.title,
+            'year_published': book.year_published,
+            'author_id': book.author_id,
+            'author': book.author.name,
+            'genres': [genre.name for genre in book.genres.all()],
+            'detail': detail and {'summary': detail.summary, 'page_count': detail.page_count},
+        }
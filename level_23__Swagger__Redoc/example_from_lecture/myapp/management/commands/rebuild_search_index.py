@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myapp import fuzzy
+from myapp.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = ('Заново строит поисковые индексы книг: полнотекстовый (FTS5 на SQLite, '
+            'tsvector на PostgreSQL) и триграммный для нечёткого поиска.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            if get_backend() is None:
+                self.stdout.write(self.style.WARNING('Полнотекстовый индекс для этой СУБД не поддерживается.'))
+            else:
+                count = rebuild_index()
+                self.stdout.write(f'Полнотекстовый индекс: {count} книг')
+            count = fuzzy.rebuild_index()
+            self.stdout.write(f'Триграммный индекс: {count} авторов и книг')
+        self.stdout.write(self.style.SUCCESS(f'Готово за {time.perf_counter() - start:.1f} с'))
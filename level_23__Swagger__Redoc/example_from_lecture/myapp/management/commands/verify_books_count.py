@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myapp.counters import find_drift, repair
+from myapp.models import Author, Genre
+
+
+class Command(BaseCommand):
+    help = ('Сверяет счётчики books_count авторов и жанров с настоящим числом живых книг '
+            'пачками по первичному ключу; с --repair исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='исправить найденные расхождения')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (Author, Genre):
+            checked = drifted = last_pk = 0
+            while True:
+                pks = list(model.objects.filter(pk__gt=last_pk).order_by('pk')
+                           .values_list('pk', flat=True)[:options['chunk_size']])
+                if not pks:
+                    break
+                with transaction.atomic():
+                    drift = find_drift(model, pks)
+                    if drift and options['repair']:
+                        repair(model, [pk for pk, _, _ in drift])
+                for pk, stored, actual in drift:
+                    self.stdout.write(f'{model.__name__} #{pk}: books_count={stored}, на самом деле {actual}')
+                checked += len(pks)
+                drifted += len(drift)
+                last_pk = pks[-1]
+            self.stdout.write(f'{model.__name__}: проверено {checked}, расхождений {drifted}')
+            total += drifted
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Все счётчики верны'))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено: {total}'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Расхождений: {total}; запустите с --repair'))
@@ -0,0 +1,237 @@
+"""
+Метрики в формате Prometheus (GET /metrics).
+
+MetricsMiddleware для каждого запроса записывает по имени URL (resolver_match.view_name)
+и методу: гистограммы времени ответа и размера ответа, число ответов по статусам,
+число и время запросов к базе, время рендеринга шаблонов и сериализации.
+
+Каждый процесс (воркер gunicorn/uvicorn) пишет значения в свой файл
+METRICS_DIR/<pid>.db через mmap — это просто прибавление к числу в памяти,
+без системных вызовов и блокировок между процессами. /metrics читает файлы
+всех процессов и суммирует значения. Все метрики — счётчики, поэтому файлы
+завершившихся воркеров можно не удалять; при деплое каталог можно очистить.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+from .timing import RequestTimings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, math.inf)
+
+# имя -> (тип, описание)
+FAMILIES = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by view and method.'),
+    'http_response_size_bytes': ('histogram', 'Response body size (non-streaming responses).'),
+    'http_responses_total': ('counter', 'Responses by view, method and status code.'),
+    'db_queries_total': ('counter', 'SQL queries executed while handling requests.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent in SQL queries.'),
+    'template_render_seconds_total': ('counter', 'Time spent rendering Django templates.'),
+    'serializer_seconds_total': ('counter', 'Time spent building serializer data.'),
+}
+
+
+class MmapStore:
+    """
+    Числа float64 по строковым ключам в файле через mmap.
+
+    Формат: [занято байт: uint32][4 байта выравнивания], затем записи
+    [длина ключа: uint32][ключ UTF-8, дополненный до кратного 8][значение: float64].
+    """
+    initial_size = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(self.initial_size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.used = struct.unpack_from('I', self.map, 0)[0] or 8
+        self.positions = {key: position for key, _, position in self.read(self.map, self.used)}
+
+    @staticmethod
+    def read(data, used=None):
+        """(ключ, значение, смещение значения) для всех записей."""
+        if used is None:
+            used = struct.unpack_from('I', data, 0)[0] or 8
+        position = 8
+        while position < used:
+            length = struct.unpack_from('I', data, position)[0]
+            key = bytes(data[position + 4:position + 4 + length]).decode()
+            position += 4 + length + (-(4 + length) % 8)
+            yield key, struct.unpack_from('d', data, position)[0], position
+            position += 8
+
+    def inc(self, key, amount=1.0):
+        with self.lock:
+            position = self.positions.get(key)
+            if position is None:
+                position = self._add(key)
+            value = struct.unpack_from('d', self.map, position)[0]
+            struct.pack_into('d', self.map, position, value + amount)
+
+    def _add(self, key):
+        encoded = key.encode()
+        padding = -(4 + len(encoded)) % 8
+        size = 4 + len(encoded) + padding + 8
+        if self.used + size > len(self.map):
+            new_size = len(self.map) * 2
+            while self.used + size > new_size:
+                new_size *= 2
+            self.map.close()
+            self.file.truncate(new_size)
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        start = self.used
+        struct.pack_into(f'I{len(encoded)}s{padding}xd', self.map, start, len(encoded), encoded, 0.0)
+        self.used += size
+        # длина обновляется последней: читатель не увидит недописанную запись
+        struct.pack_into('I', self.map, 0, self.used)
+        self.positions[key] = start + size - 8
+        return self.positions[key]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    path = Path(settings.METRICS_DIR) / f'{os.getpid()}.db'
+    # после fork (gunicorn --preload) у дочернего процесса — свой файл;
+    # METRICS_DIR меняется в тестах (override_settings)
+    if _store is None or _store.path != path:
+        with _store_lock:
+            if _store is None or _store.path != path:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                _store = MmapStore(path)
+    return _store
+
+
+@lru_cache(maxsize=4096)
+def sample_key(name, labels, le=None):
+    """Ключ записи в файле; labels — кортеж пар (имя, значение)."""
+    return json.dumps([name, dict(labels), le], separators=(',', ':'), ensure_ascii=False)
+
+
+def observe(store, name, labels, value, buckets):
+    # корзины хранятся некумулятивно (одна запись), суммируются при выводе
+    le = next(bound for bound in buckets if value <= bound)
+    store.inc(sample_key(name, labels, le))
+    store.inc(sample_key(name + '_sum', labels), value)
+
+
+def record(request, response, timings):
+    store = get_store()
+    match = getattr(request, 'resolver_match', None)
+    labels = (('view', match.view_name if match else '<unresolved>'), ('method', request.method))
+    observe(store, 'http_request_duration_seconds', labels, timings.elapsed, LATENCY_BUCKETS)
+    if not response.streaming:
+        observe(store, 'http_response_size_bytes', labels, len(response.content), SIZE_BUCKETS)
+    store.inc(sample_key('http_responses_total', (*labels, ('status', str(response.status_code)))))
+    if timings.db_count:
+        store.inc(sample_key('db_queries_total', labels), timings.db_count)
+        store.inc(sample_key('db_query_duration_seconds_total', labels), timings.db_time)
+    for name, section in (('template_render_seconds_total', 'render'), ('serializer_seconds_total', 'serialize')):
+        if section in timings.totals:
+            store.inc(sample_key(name, labels), timings.totals[section])
+
+
+class MetricsMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        with RequestTimings() as timings:
+            response = self.get_response(request)
+        record(request, response, timings)
+        return response
+
+    async def acall(self, request):
+        with RequestTimings() as timings:
+            response = await self.get_response(request)
+        record(request, response, timings)
+        return response
+
+
+def collect():
+    """Сумма значений по всем файлам процессов: {ключ: значение}."""
+    totals = defaultdict(float)
+    directory = Path(settings.METRICS_DIR)
+    for path in directory.glob('*.db') if directory.exists() else ():
+        data = path.read_bytes()
+        if len(data) < 8:
+            continue
+        for key, value, _ in MmapStore.read(data):
+            totals[key] += value
+    return totals
+
+
+def format_labels(labels, le=None):
+    labels = dict(labels)
+    if le is not None:
+        labels['le'] = '+Inf' if le == math.inf else repr(float(le))
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+def escape_label(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_metrics(totals):
+    samples = defaultdict(list)
+    buckets = defaultdict(dict)
+    for key, value in totals.items():
+        name, labels, le = json.loads(key)
+        if le is not None:
+            buckets[(name, json.dumps(labels, sort_keys=True))][le] = value
+        else:
+            samples[name].append((labels, value))
+
+    lines = []
+    for family, (kind, help_text) in FAMILIES.items():
+        family_lines = []
+        if kind == 'histogram':
+            bounds = LATENCY_BUCKETS if family == 'http_request_duration_seconds' else SIZE_BUCKETS
+            sums = {json.dumps(labels, sort_keys=True): value for labels, value in samples[family + '_sum']}
+            for (name, labels_key), counts in sorted(buckets.items()):
+                if name != family:
+                    continue
+                labels = json.loads(labels_key)
+                cumulative = 0
+                for bound in bounds:
+                    cumulative += counts.get(bound, 0)
+                    family_lines.append(f'{family}_bucket{format_labels(labels, bound)} {format_value(cumulative)}')
+                family_lines.append(f'{family}_sum{format_labels(labels)} {format_value(sums.get(labels_key, 0))}')
+                family_lines.append(f'{family}_count{format_labels(labels)} {format_value(cumulative)}')
+        else:
+            for labels, value in sorted(samples[family], key=lambda item: sorted(item[0].items())):
+                family_lines.append(f'{family}{format_labels(labels)} {format_value(value)}')
+        if family_lines:
+            lines += [f'# HELP {family} {help_text}', f'# TYPE {family} {kind}', *family_lines]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    return HttpResponse(render_metrics(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
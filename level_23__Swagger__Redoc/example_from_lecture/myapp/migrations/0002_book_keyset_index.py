@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['year_published', 'id'], name='book_year_id_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE myapp_book_fts USING fts5("
+    "title, summary, author, genres, tokenize = 'porter unicode61 remove_diacritics 2')"
+)
+POSTGRES_CREATE = [
+    "CREATE TABLE myapp_book_search ("
+    "book_id bigint PRIMARY KEY REFERENCES myapp_book (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX myapp_book_search_document_idx ON myapp_book_search USING gin (document)",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+    elif vendor == 'postgresql':
+        for sql in POSTGRES_CREATE:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE myapp_book_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE myapp_book_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_change_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_book_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('kind', models.CharField(choices=[('a', 'author'), ('b', 'book')], max_length=1)),
+                ('object_id', models.BigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['gram', 'kind', 'object_id'], name='trigram_gram_idx'), models.Index(fields=['kind', 'object_id'], name='trigram_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_trigram'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='book',
+            name='book_year_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['year_published', 'id'], name='book_live_year_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['author', 'year_published', 'id'], name='book_live_author_idx'),
+        ),
+    ]
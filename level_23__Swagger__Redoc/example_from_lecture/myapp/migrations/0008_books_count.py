@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_books(apps, schema_editor):
+    Author = apps.get_model('myapp', 'Author')
+    Book = apps.get_model('myapp', 'Book')
+    Genre = apps.get_model('myapp', 'Genre')
+    BookGenre = Genre.books.through
+
+    def subquery(books, group):
+        books = books.values(group).order_by().annotate(count=Count('pk')).values('count')
+        return Coalesce(Subquery(books), Value(0))
+
+    Author.objects.update(books_count=subquery(
+        Book.objects.filter(author=OuterRef('pk'), is_deleted=False), 'author'))
+    Genre.objects.update(books_count=subquery(
+        BookGenre.objects.filter(genre=OuterRef('pk'), book__is_deleted=False), 'genre'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_book_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='books_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='books_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_books, migrations.RunPython.noop),
+    ]
@@ -1,18 +1,77 @@
-from django.db import models
+from functools import partial
 
+from django.db import models, router, transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
 
-class Author(models.Model):
+
+class ChangeTrackedModel(models.Model):
+    """
+    Модель в ленте изменений: при сохранении получает номер ChangeSequence
+    (сигнал assign_change_seq). Номер выдаётся в той же транзакции, что и запись
+    строки, и save(update_fields=...) тоже сохраняет change_seq.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, using=None, update_fields=None, **kwargs):
+        if update_fields:
+            update_fields = {*update_fields, 'change_seq'}
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, using=using, update_fields=update_fields, **kwargs)
+
+
+class Author(ChangeTrackedModel):
     name = models.CharField(max_length=100, unique=True)
+    # номер последнего изменения (ChangeSequence) для ленты изменений
+    change_seq = models.BigIntegerField(default=0, editable=False)
+    # число живых книг, обновляется myapp/counters.py
+    books_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['change_seq', 'id'], name='author_change_seq_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Book(models.Model):
+class LiveBookManager(models.Manager):
+    """Менеджер по умолчанию: мягко удалённые книги (is_deleted) не видны."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class Book(ChangeTrackedModel):
     author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='books')
     title = models.CharField(max_length=200)
     year_published = models.IntegerField()
     is_deleted = models.BooleanField(default=False)
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    # objects (и author.books, genre.books) — только живые книги;
+    # all_objects — все, включая удалённые (админка, purge_deleted_books)
+    objects = LiveBookManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # частичные индексы только по живым книгам: удалённые строки
+            # не сканируются и не раздувают индекс.
+            # Ключ keyset-пагинации BookKeysetPagination
+            models.Index(fields=['year_published', 'id'], name='book_live_year_id_idx',
+                         condition=models.Q(is_deleted=False)),
+            # ?author= с той же сортировкой, книги автора
+            models.Index(fields=['author', 'year_published', 'id'], name='book_live_author_idx',
+                         condition=models.Q(is_deleted=False)),
+            models.Index(fields=['change_seq', 'id'], name='book_change_seq_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.author})"
@@ -27,9 +86,201 @@ class BookDetail(models.Model):
         return f"Details for {self.book.title}"
 
 
-class Genre(models.Model):
+class Genre(ChangeTrackedModel):
     name = models.CharField(max_length=50, unique=True)
     books = models.ManyToManyField(Book, related_name='genres')
+    change_seq = models.BigIntegerField(default=0, editable=False)
+    books_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['change_seq', 'id'], name='genre_change_seq_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ModelVersion(models.Model):
+    """
+    Счётчик версий модели: увеличивается при каждом изменении её данных.
+    Дешёвый "штамп" для ETag / Last-Modified без чтения самих таблиц.
+
+    Вместо модели можно передать строку — версию отдельной части данных
+    (например, 'myapp.author.name' у индекса автодополнения).
+    """
+    label = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+    modified = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+    @classmethod
+    def bump(cls, *model_classes):
+        """
+        Увеличивает версии моделей. Внутри транзакции увеличение
+        откладывается до commit и выполняется один раз на модель,
+        сколько бы объектов ни было изменено.
+        """
+        connection = transaction.get_connection()
+        for model in model_classes:
+            label = cls.get_label(model)
+            if not connection.in_atomic_block:
+                cls._bump_label(label)
+                continue
+            pending = any(getattr(func, 'version_label', None) == label
+                          for _, func, _ in connection.run_on_commit)
+            if not pending:
+                callback = partial(cls._bump_label, label)
+                callback.version_label = label
+                transaction.on_commit(callback)
+
+    @staticmethod
+    def get_label(model):
+        return model if isinstance(model, str) else model._meta.label_lower
+
+    @classmethod
+    def _bump_label(cls, label):
+        now = timezone.now()
+        updated = cls.objects.filter(label=label).update(version=F('version') + 1, modified=now)
+        if not updated:
+            cls.objects.get_or_create(label=label, defaults={'version': 1, 'modified': now})
+
+    @classmethod
+    def get_stamps(cls, *model_classes):
+        """Возвращает {label: (version, modified)} одним запросом."""
+        labels = [cls.get_label(model) for model in model_classes]
+        stamps = {label: (0, None) for label in labels}
+        for label, version, modified in cls.objects.filter(
+                label__in=labels).values_list('label', 'version', 'modified'):
+            stamps[label] = (version, modified)
+        return stamps
+
+    @staticmethod
+    def format_stamps(stamps):
+        """Строка для ETag / ключа кэша. Время изменения отличает версии после пересоздания базы."""
+        return '|'.join(
+            f'{label}:{version}:{modified.timestamp() if modified else ""}'
+            for label, (version, modified) in sorted(stamps.items())
+        )
+
+
+# Любое сохранение/удаление данных каталога увеличивает версию модели
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=BookDetail)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=BookDetail)
+@receiver(post_delete, sender=Genre)
+def bump_model_version(sender, **kwargs):
+    ModelVersion.bump(sender)
+
+
+@receiver(m2m_changed, sender=Genre.books.through)
+def bump_genre_books_version(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        ModelVersion.bump(Genre, Book)
+
+
+class ChangeSequence(models.Model):
+    """
+    Счётчик номеров изменений для ленты /api/books/changes/.
+
+    Номер выдаётся внутри транзакции записи и блокирует строку счётчика
+    до commit, поэтому изменения одной модели фиксируются в порядке номеров
+    и клиент, запомнивший номер, не пропустит "запоздавший" commit.
+    Вне транзакции next() вызывать нельзя: счётчик был бы зафиксирован
+    раньше строки.
+    """
+    label = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.label}: {self.value}"
+
+    @classmethod
+    def next(cls, model):
+        if not transaction.get_connection(router.db_for_write(cls)).in_atomic_block:
+            raise transaction.TransactionManagementError(
+                'ChangeSequence.next() must be called inside the transaction that writes the row.')
+        label = model._meta.label_lower
+        if not cls.objects.filter(label=label).update(value=F('value') + 1):
+            cls.objects.get_or_create(label=label)
+            cls.objects.filter(label=label).update(value=F('value') + 1)
+        return cls.objects.filter(label=label).values_list('value', flat=True).get()
+
+
+class Tombstone(models.Model):
+    """Запись об удалении строки (физическом) для ленты изменений."""
+    label = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['change_seq', 'id'], name='tombstone_change_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.label} #{self.object_id} deleted"
+
+
+# Каждое сохранение книги, автора или жанра получает новый номер изменения
+@receiver(pre_save, sender=Author)
+@receiver(pre_save, sender=Book)
+@receiver(pre_save, sender=Genre)
+def assign_change_seq(sender, instance, **kwargs):
+    instance.change_seq = ChangeSequence.next(sender)
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Genre)
+def create_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        label=sender._meta.label_lower,
+        object_id=instance.pk,
+        change_seq=ChangeSequence.next(Tombstone),
+    )
+
+
+# Состав жанров входит в запись книги в ленте — изменение связи меняет книгу
+@receiver(m2m_changed, sender=Genre.books.through)
+def touch_books_on_genres_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # book.genres.add(...) — изменилась сама книга
+        book_pks = [instance.pk]
+    elif action == 'pre_clear':
+        book_pks = list(instance.books.values_list('pk', flat=True))
+    else:
+        book_pks = pk_set
+    if book_pks:
+        Book.all_objects.filter(pk__in=book_pks).update(change_seq=ChangeSequence.next(Book))
+
+
+class Trigram(models.Model):
+    """
+    Инвертированный индекс триграмм для нечёткого поиска (myapp/fuzzy.py):
+    строка на каждую триграмму имени автора или названия книги.
+    """
+    KIND_CHOICES = [('a', 'author'), ('b', 'book')]
+
+    gram = models.CharField(max_length=3)
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            # поиск: триграмма -> объекты; покрывающий, без обращения к таблице
+            models.Index(fields=['gram', 'kind', 'object_id'], name='trigram_gram_idx'),
+            # переиндексация объекта
+            models.Index(fields=['kind', 'object_id'], name='trigram_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.gram!r} -> {self.kind}#{self.object_id}"
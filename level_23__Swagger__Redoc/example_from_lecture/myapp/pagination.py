@@ -0,0 +1,265 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .models import ModelVersion
+
+
+def get_query_params(request):
+    # DRF Request или обычный HttpRequest (async-вью)
+    return getattr(request, 'query_params', request.GET)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) пагинация по составному ключу сортировки.
+
+    Вместо OFFSET страница ищется условием WHERE по значениям ключа
+    последней записи предыдущей страницы, поэтому страница 10 000
+    читается так же быстро, как первая. COUNT(*) не выполняется:
+    наличие следующей страницы определяется по лишней (page_size + 1) строке.
+
+    Последнее поле `ordering` должно быть уникальным (обычно 'id'),
+    а для всего ключа должен существовать составной индекс.
+    """
+    ordering = ('id',)
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.seek_queryset(queryset, request)
+        # Берём на одну запись больше, чтобы узнать, есть ли ещё страница
+        return self.finish_page(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request):
+        """Асинхронный вариант paginate_queryset() для async-вью."""
+        queryset = self.seek_queryset(queryset, request)
+        return self.finish_page([obj async for obj in queryset[:self.page_size + 1].aiterator()])
+
+    def seek_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.descending = [field.startswith('-') for field in self.ordering]
+
+        self.cursor_values, self.reverse = self.decode_cursor(request)
+        if self.cursor_values is not None:
+            self.cursor_values = self.clean_cursor_values(queryset.model, self.cursor_values)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if self.cursor_values is not None:
+            queryset = queryset.filter(self._seek_filter(self.cursor_values, self.reverse))
+        return queryset
+
+    def finish_page(self, results):
+        values, reverse = self.cursor_values, self.reverse
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = values is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+
+        self.first_key = self._key(results[0]) if results else None
+        self.last_key = self._key(results[-1]) if results else None
+        if not results and values is not None:
+            # Пустая страница: курсоры остаются на исходной позиции
+            self.first_key = self.last_key = values
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(get_query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last_key, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first_key, reverse=True)
+
+    def encode_cursor(self, values, reverse):
+        payload = {'v': list(values)}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        cursor = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = get_query_params(request).get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            values = payload['v']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def clean_cursor_values(self, model, values):
+        """Приводит значения курсора к типам полей сортировки: подделанный курсор — 404, а не 500."""
+        try:
+            values = [model._meta.get_field(field).clean(value, None)
+                      for field, value in zip(self.fields, values)]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        # AutoField пропускает None, а сравнивать с NULL нельзя
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _key(self, obj):
+        # obj — экземпляр модели или словарь из values()
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def _seek_filter(self, values, reverse):
+        """
+        Строит условие "ключ строго после values" для составного ключа:
+            a > x OR (a = x AND b > y) OR ...
+        и дополнительно ограничивает первое поле (a >= x),
+        чтобы база могла начать сканирование индекса с нужной позиции.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value, descending in zip(self.fields, values, self.descending):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        field, value, descending = self.fields[0], values[0], self.descending[0]
+        lookup = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{field}__{lookup}': value}) & condition
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class BookKeysetPagination(KeysetPagination):
+    ordering = ('year_published', 'id')
+
+
+class AuthorKeysetPagination(KeysetPagination):
+    ordering = ('name', 'id')
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк по статистике базы без COUNT(*); None — оценки нет.
+
+    Только PostgreSQL: число строк из плана EXPLAIN (работает и с фильтрами).
+    В SQLite нет статистики, которая учитывала бы WHERE (а менеджер книг
+    всегда фильтрует is_deleted), поэтому там используется кэшированный COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator, который не выполняет COUNT(*) на каждой странице.
+
+    Точное значение кэшируется на `count_timeout` секунд; ключ включает
+    версии моделей (ModelVersion) всех таблиц запроса, поэтому запись
+    в них сразу делает кэш неактуальным. Если оценка по статистике базы
+    (PostgreSQL) не меньше `estimate_threshold`, возвращается оценка
+    и `count_is_estimate` становится True.
+    """
+    count_timeout = 60
+    estimate_threshold = 100_000
+
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+
+        queryset = self.object_list
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= self.estimate_threshold:
+            self.count_is_estimate = True
+            return estimate
+
+        key = self.get_count_cache_key(queryset)
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_timeout)
+        return count
+
+    @staticmethod
+    def get_count_cache_key(queryset):
+        tables = {alias.table_name for alias in queryset.query.alias_map.values()}
+        models = {model for model in apps.get_models(include_auto_created=True)
+                  if model._meta.db_table in tables}
+        models.add(queryset.model)
+        stamps = ModelVersion.get_stamps(*models)
+        sql, params = queryset.query.sql_with_params()
+        key = '|'.join([queryset.db, sql, repr(params), ModelVersion.format_stamps(stamps)])
+        return 'count:' + hashlib.sha256(key.encode()).hexdigest()
@@ -0,0 +1,218 @@
+"""
+Бюджет SQL-запросов на запрос к вью и поиск N+1.
+
+QueryBudgetMiddleware записывает все SQL-запросы, выполненные за время
+обработки запроса (включая рендеринг шаблона). Запросы, отличающиеся только
+параметрами (одинаковая "форма" SQL), повторившиеся не меньше
+QUERY_BUDGET_REPEAT_THRESHOLD раз, считаются N+1; начиная с этого повтора
+у запросов записывается место вызова — строка шаблона и/или строка кода
+проекта (обход стека дорог, для остальных запросов он не нужен).
+Многострочные INSERT (пачки bulk_create) N+1 не считаются.
+
+Бюджет объявляется у вью: атрибут query_budget у класса (View, APIView,
+ViewSet) или декоратор @query_budget(n) у функции. Превышение и N+1
+пишутся в лог "myapp.querybudget"; при QUERY_BUDGET_RAISE = True
+(в тестах — декоратор enforce_query_budgets) превышение бюджета —
+исключение QueryBudgetExceeded, и тест падает.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.base import Node
+
+from . import timing
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+# INSERT ... VALUES (...), (...) — пачка bulk_create, одинаковые пачки не N+1
+MULTI_ROW_INSERT = re.compile(r'^INSERT .* VALUES \([^()]*\), \(', re.DOTALL)
+PROJECT_ROOT = str(settings.BASE_DIR) + os.sep
+# кадры обёрток запросов — не место вызова
+SKIPPED_FILES = {__file__, timing.__file__}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class Query:
+    sql: str
+    duration: float
+    shape: str
+    call_site: str = None
+
+
+def get_shape(sql):
+    # IN (%s, %s, ...) разной длины — та же форма; пачки INSERT — None
+    if MULTI_ROW_INSERT.match(sql):
+        return None
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def get_call_site():
+    """'шаблон:строка / файл проекта:строка in функция' для текущего запроса к базе."""
+    template_site = python_site = None
+    frame = sys._getframe(2)
+    while frame is not None and not (template_site and python_site):
+        code = frame.f_code
+        if template_site is None and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            if isinstance(node, Node) and node.origin is not None and node.token is not None:
+                template_site = f'{node.origin.template_name}:{node.token.lineno}'
+        elif (python_site is None and code.co_filename.startswith(PROJECT_ROOT)
+              and code.co_filename not in SKIPPED_FILES and 'site-packages' not in code.co_filename):
+            python_site = f'{os.path.relpath(code.co_filename, PROJECT_ROOT)}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return ' / '.join(site for site in (template_site, python_site) if site) or '?'
+
+
+class QueryRecorder:
+    """
+    Записывает SQL-запросы всех соединений внутри `with QueryRecorder() as recorder:`,
+    в том числе выполненные в потоках sync_to_async (timing.context_execute_wrapper).
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.threshold = settings.QUERY_BUDGET_REPEAT_THRESHOLD
+        self.shape_counts = Counter()
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            query = Query(sql, time.perf_counter() - start, get_shape(sql))
+            if query.shape is not None:
+                self.shape_counts[query.shape] += 1
+                # место вызова — только у повторяющихся (кандидатов в N+1)
+                if self.shape_counts[query.shape] >= self.threshold:
+                    query.call_site = get_call_site()
+            self.queries.append(query)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        self._stack.enter_context(timing.context_execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def find_repeated(self, threshold=None):
+        """[(форма SQL, [Query, ...])] — повторяющиеся запросы, кандидаты в N+1."""
+        if threshold is None:
+            threshold = self.threshold
+        groups = defaultdict(list)
+        for query in self.queries:
+            if query.shape is not None:
+                groups[query.shape].append(query)
+        return [(shape, queries) for shape, queries in groups.items() if len(queries) >= threshold]
+
+    def report(self, label, budget=None):
+        total = sum(query.duration for query in self.queries) * 1000
+        lines = [f'{label}: {len(self.queries)} queries ({total:.1f} ms)'
+                 + (f', budget {budget}' if budget is not None else '')]
+        for shape, queries in self.find_repeated():
+            lines.append(f'  N+1: {len(queries)} x {shape}')
+            call_sites = Counter(query.call_site for query in queries if query.call_site)
+            for call_site, count in call_sites.most_common():
+                lines.append(f'    {count} x at {call_site}')
+        return '\n'.join(lines)
+
+    def check(self, label, budget):
+        """Пишет в лог N+1 и превышение бюджета; при QUERY_BUDGET_RAISE превышение — исключение."""
+        exceeded = budget is not None and len(self.queries) > budget
+        if not exceeded and not self.find_repeated():
+            return
+        report = self.report(label, budget)
+        if exceeded and settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(report)
+        logger.warning(report)
+
+
+def query_budget(budget):
+    """Объявляет бюджет запросов функции-вью: @query_budget(5)."""
+    def decorator(view_func):
+        view_func.query_budget = budget
+        return view_func
+    return decorator
+
+
+def get_view_budget(request, view_func):
+    """
+    Бюджет вью: число, None (без бюджета) или у ViewSet словарь
+    {action: число, 'default': число} — например, без бюджета для массовых операций.
+    """
+    budget = getattr(view_func, 'query_budget', None)
+    # as_view(): Django хранит класс в view_class, DRF — в cls
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    if budget is None and view_class is not None:
+        budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        action = (getattr(view_func, 'actions', None) or {}).get(request.method.lower())
+        budget = budget.get(action, budget.get('default'))
+    return settings.QUERY_BUDGET_DEFAULT if budget is None else budget
+
+
+class QueryBudgetMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        if not settings.QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def acall(self, request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return await self.get_response(request)
+        with QueryRecorder() as recorder:
+            response = await self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    @staticmethod
+    def check(request, recorder):
+        # вью берётся из resolver_match, а не в process_view: его Django
+        # в async-режиме выполнял бы в потоке через sync_to_async
+        match = getattr(request, 'resolver_match', None)
+        budget = get_view_budget(request, match.func) if match else settings.QUERY_BUDGET_DEFAULT
+        recorder.check(f'{request.method} {request.path}', budget)
+
+
+@contextmanager
+def assert_query_budget(budget, label='block'):
+    """
+    Для тестов: `with assert_query_budget(3): ...` — падает, если внутри
+    выполнено больше `budget` запросов. В сообщении — найденные N+1 с местами вызова.
+    """
+    with QueryRecorder() as recorder:
+        yield recorder
+    if len(recorder.queries) > budget:
+        raise QueryBudgetExceeded(recorder.report(label, budget))
+
+
+def enforce_query_budgets(test):
+    """Декоратор тестов: превышение бюджета вью в тестовом клиенте роняет тест."""
+    from django.test import override_settings
+    return override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True)(test)
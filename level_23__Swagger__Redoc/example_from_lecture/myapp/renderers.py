@@ -0,0 +1,159 @@
+import csv
+import io
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .timing import measure
+
+# Необязательные ускорители: без них используются стандартные классы DRF,
+# а MessagePack / CBOR просто не подключаются (см. REST_FRAMEWORK в settings.py)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+def encode_default(obj):
+    # Типы, которых нет в JSON/MessagePack/CBOR (Decimal, lazy-строки, QuerySet...),
+    # приводятся так же, как это делает JSONEncoder DRF
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson (C-расширение). Вывод совпадает с JSONRenderer DRF;
+    для ответов с отступами (Browsable API) и без orjson используется JSONRenderer.
+
+    Отличия orjson: NaN и бесконечность записываются как null (JSONRenderer
+    при STRICT_JSON выбрасывает ValueError), а целые длиннее 64 бит он
+    не кодирует — такие ответы отдаются через JSONRenderer.
+    """
+
+    @measure('encode')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как в JSONRenderer: U+2028 / U+2029 экранируются для встраивания в JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    @measure('encode')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except ValueError as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
+
+
+class CBORRenderer(BaseRenderer):
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    @measure('encode')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data, default=lambda encoder, obj: encoder.encode(encode_default(obj)))
+
+
+class CBORParser(BaseParser):
+    media_type = 'application/cbor'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return cbor2.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'CBOR parse error - {exc}')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON: один объект на строку."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(dump_ndjson_row(row) for row in rows).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV из списка словарей (или одного словаря, например с ошибками)."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        header = list(rows[0]) if rows else []
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow([row.get(name) for name in header])
+        return buffer.getvalue().encode(self.charset)
+
+
+def dump_ndjson_row(row):
+    return json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: writerow() сразу возвращает строку, ничего не накапливая."""
+
+    def write(self, value):
+        return value
@@ -0,0 +1,134 @@
+"""
+Чтение с реплик, запись в основную базу (settings.DATABASE_ROUTERS).
+
+Для приложений myapp и accounts запросы на чтение внутри HTTP-запроса уходят
+на одну (на весь запрос) из реплик settings.DATABASE_REPLICAS, запись — всегда в 'default'.
+Основная база используется и для чтения, если:
+  - реплики не настроены или код выполняется вне запроса (команды, shell);
+  - запрос изменяющий (POST/PUT/PATCH/DELETE) или уже что-то записал;
+  - открыта транзакция в основной базе;
+  - пользователь недавно что-то записал: ReplicaMiddleware ставит cookie
+    на REPLICA_PIN_SECONDS, чтобы он сразу видел свои изменения, несмотря
+    на отставание реплики;
+  - чтение обёрнуто в force_primary().
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_db_pin'
+ROUTED_APPS = {'myapp', 'accounts'}
+
+_request_state = ContextVar('replica_request_state', default=None)
+_forced = ContextVar('force_primary', default=False)
+
+
+class RequestState:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        # реплика выбирается один раз на запрос: все чтения видят одно состояние
+        self.replica = None
+
+
+@contextmanager
+def force_primary():
+    """Чтение только из основной базы: `with force_primary():` или декоратор `@force_primary()`."""
+    token = _forced.set(True)
+    try:
+        yield
+    finally:
+        _forced.reset(token)
+
+
+def get_read_db():
+    replicas = settings.DATABASE_REPLICAS
+    state = _request_state.get()
+    if (not replicas or state is None or state.pinned or state.wrote or _forced.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+        return DEFAULT_DB_ALIAS
+    if state.replica is None:
+        state.replica = random.choice(replicas)
+    return state.replica
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in ROUTED_APPS:
+            return get_read_db()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APPS:
+            return None
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же данные, что и в основной базе
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # реплики получают схему репликацией
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        state = self.get_state(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(response, state)
+
+    async def acall(self, request):
+        # контекст (и state) передаётся в потоки sync_to_async, где выполняются запросы к базе
+        state = self.get_state(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(response, state)
+
+    def get_state(self, request):
+        pinned = request.method not in ('GET', 'HEAD', 'OPTIONS') or self.is_pinned(request)
+        return RequestState(pinned)
+
+    @staticmethod
+    def pin(response, state):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(int(time.time() + seconds)), max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+    @staticmethod
+    def is_pinned(request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
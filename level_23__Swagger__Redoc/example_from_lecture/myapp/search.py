@@ -0,0 +1,188 @@
+"""
+Полнотекстовый поиск книг по названию, аннотации (BookDetail.summary),
+имени автора и названиям жанров.
+
+SQLite — виртуальная таблица FTS5 с ранжированием bm25(); русские слова
+приводятся к основе стеммером Snowball (myapp/stemmer.py), английские —
+токенайзером porter. PostgreSQL — tsvector с GIN-индексом и конфигурацией
+'russian' (кириллица через snowball, латиница через english_stem),
+ранжирование ts_rank_cd.
+
+Индекс обновляется сигналами при каждом изменении данных; для книг,
+созданных до появления индекса: python manage.py rebuild_search_index.
+"""
+import re
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import stemmer
+from .models import Author, Book, BookDetail, Genre
+
+CHUNK_SIZE = 1000
+CYRILLIC = re.compile('[а-яё]')
+
+
+def normalize(text):
+    """Слова текста через пробел, русские — в виде основ."""
+    words = re.findall(r'\w+', (text or '').lower().replace('ё', 'е'))
+    return ' '.join(stemmer.stem(word) if CYRILLIC.search(word) else word for word in words)
+
+
+def get_documents(book_ids):
+    """(id, название, аннотация, автор, жанры) для книг, которые должны быть в индексе."""
+    genres = defaultdict(list)
+    for book_id, name in Genre.books.through.objects.filter(
+            book_id__in=book_ids).values_list('book_id', 'genre__name'):
+        genres[book_id].append(name)
+    return [
+        (pk, title, summary or '', author, ' '.join(genres[pk]))
+        for pk, title, summary, author in Book.objects.filter(pk__in=book_ids, is_deleted=False)
+        .values_list('pk', 'title', 'detail__summary', 'author__name')
+    ]
+
+
+class SQLiteSearch:
+    table = 'myapp_book_fts'
+    # веса bm25 по колонкам: title, summary, author, genres
+    rank = f'bm25({table}, 10.0, 1.0, 4.0, 2.0)'
+
+    def index(self, cursor, book_ids, documents):
+        cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in book_ids])
+        cursor.executemany(
+            f'INSERT INTO {self.table} (rowid, title, summary, author, genres) VALUES (%s, %s, %s, %s, %s)',
+            [(pk, *map(normalize, texts)) for pk, *texts in documents])
+
+    def remove(self, cursor, book_ids):
+        cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({", ".join(["%s"] * len(book_ids))})', book_ids)
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, cursor, query, limit, offset):
+        # каждое слово — отдельная фраза в кавычках: спецсинтаксис FTS5 из запроса не применяется
+        match = ' '.join(f'"{word}"' for word in normalize(query).split())
+        if not match:
+            return []
+        cursor.execute(
+            f'SELECT rowid, -{self.rank} FROM {self.table} WHERE {self.table} MATCH %s '
+            f'ORDER BY {self.rank} LIMIT %s OFFSET %s', [match, limit, offset])
+        return cursor.fetchall()
+
+
+class PostgresSearch:
+    table = 'myapp_book_search'
+    document = ("setweight(to_tsvector('russian', %s), 'A') || setweight(to_tsvector('russian', %s), 'D') || "
+                "setweight(to_tsvector('russian', %s), 'B') || setweight(to_tsvector('russian', %s), 'C')")
+
+    def index(self, cursor, book_ids, documents):
+        cursor.execute(f'DELETE FROM {self.table} WHERE book_id = ANY(%s)', [list(book_ids)])
+        cursor.executemany(
+            f'INSERT INTO {self.table} (book_id, document) VALUES (%s, {self.document})',
+            documents)
+
+    def remove(self, cursor, book_ids):
+        cursor.execute(f'DELETE FROM {self.table} WHERE book_id = ANY(%s)', [list(book_ids)])
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {self.table}')
+
+    def search(self, cursor, query, limit, offset):
+        cursor.execute(
+            f"SELECT book_id, ts_rank_cd(document, query) AS rank "
+            f"FROM {self.table}, websearch_to_tsquery('russian', %s) query "
+            f"WHERE document @@ query ORDER BY rank DESC, book_id LIMIT %s OFFSET %s",
+            [query, limit, offset])
+        return cursor.fetchall()
+
+
+BACKENDS = {'sqlite': SQLiteSearch(), 'postgresql': PostgresSearch()}
+
+
+def get_backend():
+    return BACKENDS.get(connection.vendor)
+
+
+def index_books(book_ids):
+    """Переиндексирует книги; удалённые и мягко удалённые убираются из индекса."""
+    backend = get_backend()
+    book_ids = list(book_ids)
+    if backend is None or not book_ids:
+        return
+    with connection.cursor() as cursor:
+        for start in range(0, len(book_ids), CHUNK_SIZE):
+            chunk = book_ids[start:start + CHUNK_SIZE]
+            backend.index(cursor, chunk, get_documents(chunk))
+
+
+def unindex_books(book_ids):
+    """Убирает удалённые книги из индекса, не читая их документы (массовое удаление)."""
+    backend = get_backend()
+    book_ids = list(book_ids)
+    if backend is None or not book_ids:
+        return
+    with connection.cursor() as cursor:
+        for start in range(0, len(book_ids), CHUNK_SIZE):
+            backend.remove(cursor, book_ids[start:start + CHUNK_SIZE])
+
+
+def rebuild_index():
+    backend = get_backend()
+    if backend is None:
+        return 0
+    with connection.cursor() as cursor:
+        backend.clear(cursor)
+    book_ids = list(Book.objects.filter(is_deleted=False).values_list('pk', flat=True).order_by('pk'))
+    index_books(book_ids)
+    return len(book_ids)
+
+
+def search_books(query, limit, offset=0):
+    """[(id книги, релевантность)] по убыванию релевантности."""
+    backend = get_backend()
+    if backend is None:
+        # другие СУБД — без индекса, полным просмотром
+        pks = Book.objects.filter(
+            Q(title__icontains=query) | Q(detail__summary__icontains=query) | Q(author__name__icontains=query),
+            is_deleted=False,
+        ).order_by('pk').values_list('pk', flat=True)[offset:offset + limit]
+        return [(pk, 0.0) for pk in pks]
+    with connection.cursor() as cursor:
+        return backend.search(cursor, query, limit, offset)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def index_book(sender, instance, **kwargs):
+    index_books([instance.pk])
+
+
+@receiver(post_save, sender=BookDetail)
+@receiver(post_delete, sender=BookDetail)
+def index_book_detail(sender, instance, **kwargs):
+    index_books([instance.book_id])
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+def index_related_books(sender, instance, created, **kwargs):
+    # новое имя автора или жанра входит в документы всех его книг
+    if not created:
+        index_books(instance.books.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Genre.books.through)
+def index_genre_books(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # book.genres.add(...) / remove / clear
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_books([instance.pk])
+    elif action == 'pre_clear':
+        instance._search_cleared_books = list(instance.books.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        index_books(getattr(instance, '_search_cleared_books', []))
+    elif action in ('post_add', 'post_remove'):
+        index_books(pk_set)
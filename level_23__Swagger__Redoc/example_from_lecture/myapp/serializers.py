@@ -1,15 +1,274 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Author, Book
+from .models import Author, Book, BookDetail, ChangeSequence, Genre, ModelVersion, Tombstone
+from . import fuzzy
+from .counters import BookGenre, apply_book_changes, book_state
+from .search import index_books, unindex_books
+from .timing import measure
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+def to_pk(value):
+    """Приводит присланный клиентом первичный ключ к int (или None, если это не ключ)."""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, который при массовой валидации берёт объекты
+    из заранее загруженного словаря `prefetched` вместо запроса на каждый элемент.
+    """
+    prefetched = None
+
+    def to_internal_value(self, data):
+        if self.prefetched is None:
+            return super().to_internal_value(data)
+        pk = to_pk(data)
+        if pk is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.prefetched[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class TimedDataMixin:
+    """Время построения .data учитывается как "serialize" (myapp/timing.py)."""
+
+    @property
+    def data(self):
+        with measure('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class BookListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """
+    Массовое создание, обновление и удаление книг.
+
+    Все авторы (и при обновлении все книги) загружаются одним запросом,
+    запись выполняется через bulk_create / bulk_update, удаление — destroy().
+    Ошибки возвращаются списком: по одному элементу на каждый объект запроса.
+    """
+    batch_size = 1000
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            items = [item for item in data if isinstance(item, dict)]
+            author_pks = {to_pk(item.get('author')) for item in items} - {None}
+            self.child.fields['author'].prefetched = Author.objects.in_bulk(author_pks)
+            if self.instance is not None:
+                book_pks = {to_pk(item.get('id')) for item in items} - {None}
+                self.books = self.instance.in_bulk(book_pks)
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.child.fields['author'].prefetched = None
+
+    def run_child_validation(self, data):
+        if self.instance is None or not isinstance(data, dict):
+            return super().run_child_validation(data)
+
+        if 'id' not in data:
+            raise serializers.ValidationError({'id': ['This field is required.']})
+        pk = to_pk(data['id'])
+        if pk not in self.books:
+            raise serializers.ValidationError(
+                {'id': [f'Invalid pk "{data["id"]}" - object does not exist.']}
+            )
+        self.child.instance = self.books[pk]
+        self.child.initial_data = data
+        validated = super().run_child_validation(data)
+        validated['id'] = pk
+        return validated
+
+    def create(self, validated_data):
+        change_seq = ChangeSequence.next(Book)
+        books = [Book(**attrs, change_seq=change_seq) for attrs in validated_data]
+        books = Book.objects.bulk_create(books, batch_size=self.batch_size)
+        # bulk_create не отправляет сигналы
+        ModelVersion.bump(Book)
+        apply_book_changes((book.pk, None, book_state(book)) for book in books)
+        index_books(book.pk for book in books)
+        fuzzy.index_objects('b', (book.pk for book in books))
+        return books
+
+    def update(self, instance, validated_data):
+        books = []
+        fields = set()
+        states = {}
+        for attrs in validated_data:
+            book = self.books[attrs.pop('id')]
+            states.setdefault(book.pk, book_state(book))
+            for field, value in attrs.items():
+                setattr(book, field, value)
+            fields.update(attrs)
+            books.append(book)
+        if fields:
+            # bulk_update не отправляет pre_save — номер изменения ставим сами
+            change_seq = ChangeSequence.next(Book)
+            for book in books:
+                book.change_seq = change_seq
+            fields.add('change_seq')
+            Book.objects.bulk_update(books, fields, batch_size=self.batch_size)
+            ModelVersion.bump(Book)
+            if fields & {'author', 'is_deleted'}:
+                apply_book_changes((pk, before, book_state(self.books[pk])) for pk, before in states.items())
+            index_books(book.pk for book in books)
+            if fields & {'title', 'is_deleted'}:
+                fuzzy.index_objects('b', (book.pk for book in books))
+        return books
+
+    def destroy(self, book_ids):
+        """
+        Удаляет книги (вызывать в транзакции). Как и bulk_create, без сигналов
+        на каждую строку: счётчики, записи об удалении (Tombstone) и поисковые
+        индексы обновляются несколькими запросами на всю пачку.
+        """
+        book_ids = list(book_ids)
+        states = Book.all_objects.filter(pk__in=book_ids).values_list('pk', 'author_id', 'is_deleted')
+        # до удаления связей: apply_book_changes читает жанры книг
+        apply_book_changes((pk, (author_id, not is_deleted), None) for pk, author_id, is_deleted in states)
+        change_seq = ChangeSequence.next(Tombstone)
+        Tombstone.objects.bulk_create(
+            [Tombstone(label=Book._meta.label_lower, object_id=pk, change_seq=change_seq) for pk in book_ids],
+            batch_size=self.batch_size)
+        for start in range(0, len(book_ids), self.batch_size):
+            chunk = book_ids[start:start + self.batch_size]
+            # связанные строки — раньше книг: внешние ключи проверяются при commit
+            for queryset in (BookDetail.objects.filter(book_id__in=chunk),
+                             BookGenre.objects.filter(book_id__in=chunk),
+                             Book.all_objects.filter(pk__in=chunk)):
+                queryset._raw_delete(queryset.db)
+        ModelVersion.bump(Book, BookDetail, Genre)
+        unindex_books(book_ids)
+        fuzzy.unindex_objects('b', book_ids)
+
+
+class ExpandableFieldsMixin:
+    """
+    Sparse fieldsets и раскрытие связей для ModelSerializer.
+
+    ?fields=id,title   — оставить в ответе только перечисленные поля;
+    ?expand=author     — заменить связь вложенным объектом (см. `expandable_fields`).
+    Связь, которой нет среди обычных полей (genres, detail), раскрывается
+    и без ?expand=, если указана в ?fields=.
+
+    По той же "форме" ответа `optimize_queryset` строит select_related /
+    prefetch_related / only(), чтобы список не порождал N+1 запросов
+    и не читал лишних колонок.
+    """
+    expandable_fields = {}
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = serializer_class(**options)
+        if fields is not None:
+            allowed = set(fields) | set(expand)
+            for name in list(self.fields):
+                if name not in allowed:
+                    self.fields.pop(name)
+
+    @classmethod
+    def parse_shape(cls, query_params):
+        """Разбирает ?fields= и ?expand=, возвращает (fields или None, expand)."""
+        def split(param):
+            value = query_params.get(param, '')
+            return [name for name in (part.strip() for part in value.split(',')) if name]
+
+        fields = split(cls.fields_query_param) or None
+        expand = split(cls.expand_query_param)
+
+        errors = {}
+        unknown = set(fields or ()) - set(cls.Meta.fields) - set(cls.expandable_fields)
+        if unknown:
+            errors[cls.fields_query_param] = [f'Unknown fields: {", ".join(sorted(unknown))}.']
+        unknown = set(expand) - set(cls.expandable_fields)
+        if unknown:
+            errors[cls.expand_query_param] = [f'Cannot expand: {", ".join(sorted(unknown))}.']
+        if errors:
+            raise serializers.ValidationError(errors)
+        if fields is not None:
+            # без раскрытия такой связи в ответе просто не было бы
+            expand += [name for name in fields if name not in cls.Meta.fields and name not in expand]
+        return fields, expand
+
+    @classmethod
+    def optimize_queryset(cls, queryset, fields, expand, extra_fields=()):
+        """Добавляет к queryset select_related / prefetch_related / only() под форму ответа."""
+        opts = cls.Meta.model._meta
+        names = set(fields if fields is not None else cls.Meta.fields) | set(expand)
+        only = {opts.pk.name, *extra_fields}
+        select = []
+        prefetch = []
+
+        for name in names:
+            field = opts.get_field(name)
+            if name not in expand:
+                if field.concrete:
+                    only.add(field.name)
+                continue
+
+            serializer_class, _ = cls.expandable_fields[name]
+            related_fields = list(serializer_class.Meta.fields)
+            if field.many_to_many or field.one_to_many:
+                if field.one_to_many:
+                    related_fields.append(field.field.name)
+                related = field.related_model.objects.only(*related_fields)
+                prefetch.append(Prefetch(name, queryset=related))
+            else:
+                select.append(name)
+                if field.concrete:
+                    only.add(name)
+                only.update(f'{name}__{related}' for related in related_fields)
+
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*only)
+
+
+class AuthorSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = Author
-        fields = ["id", "name"]
+        fields = ["id", "name", "books_count"]
+        list_serializer_class = TimedListSerializer
+
+
+class GenreSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Genre
+        fields = ["id", "name", "books_count"]
+
 
+class BookDetailSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BookDetail
+        fields = ["summary", "page_count"]
+
+
+class BookSerializer(TimedDataMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
+    author = PrefetchedPrimaryKeyRelatedField(queryset=Author.objects.all())
+
+    expandable_fields = {
+        'author': (AuthorSerializer, {'read_only': True}),
+        'genres': (GenreSerializer, {'many': True, 'read_only': True}),
+        'detail': (BookDetailSerializer, {'read_only': True, 'allow_null': True}),
+    }
 
-class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = ["id", "title", "year_published", "author"]
-
+        list_serializer_class = BookListSerializer
@@ -0,0 +1,102 @@
+"""
+Стеммер русского языка (алгоритм Snowball, https://snowballstem.org/algorithms/russian/stemmer.html).
+
+Нужен поиску на SQLite: у FTS5 есть только английский porter.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+# (окончание, нужна ли перед ним "а" или "я"), длинные раньше коротких
+PERFECTIVE_GERUND = [('вшись', True), ('ившись', False), ('ывшись', False), ('вши', True),
+                     ('ивши', False), ('ывши', False), ('в', True), ('ив', False), ('ыв', False)]
+ADJECTIVE = ['ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+             'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею']
+PARTICIPLE = [('ем', True), ('нн', True), ('вш', True), ('ющ', True), ('щ', True),
+              ('ивш', False), ('ывш', False), ('ующ', False)]
+REFLEXIVE = ['ся', 'сь']
+VERB = [(ending, True) for ending in ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло',
+                                      'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно')] + \
+       [(ending, False) for ending in ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли',
+                                       'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено',
+                                       'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь',
+                                       'ую', 'ю')]
+NOUN = ['а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей', 'ой',
+        'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию',
+        'ью', 'ю', 'ия', 'ья', 'я']
+DERIVATIONAL = ['ость', 'ост']
+SUPERLATIVE = ['ейше', 'ейш']
+
+
+def _by_length(endings):
+    return sorted(endings, key=lambda item: -len(item[0] if isinstance(item, tuple) else item))
+
+
+PERFECTIVE_GERUND, PARTICIPLE, VERB = map(_by_length, (PERFECTIVE_GERUND, PARTICIPLE, VERB))
+ADJECTIVE, REFLEXIVE, NOUN = map(_by_length, (ADJECTIVE, REFLEXIVE, NOUN))
+
+
+def _remove(word, endings):
+    """Убирает самое длинное подходящее окончание; None, если его нет."""
+    for item in endings:
+        ending, after_a = item if isinstance(item, tuple) else (item, False)
+        if word.endswith(ending):
+            stem = word[:-len(ending)]
+            if after_a and not stem.endswith(('а', 'я')):
+                return None
+            return stem
+    return None
+
+
+def _region(word, start):
+    """Начало области R1 (от start): после первой согласной, идущей за гласной."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+# слова в каталоге повторяются: при индексации большинство основ берётся из кэша
+@lru_cache(maxsize=65536)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    match = re.search(f'[{VOWELS}]', word)
+    if not match:
+        return word
+    prefix, rv = word[:match.end()], word[match.end():]
+    r2 = _region(word, _region(word, 0)) - len(prefix)
+
+    # Шаг 1: деепричастие, иначе возвратность + прилагательное/глагол/существительное
+    stemmed = _remove(rv, PERFECTIVE_GERUND)
+    if stemmed is None:
+        rv = _remove(rv, REFLEXIVE) or rv
+        stemmed = _remove(rv, ADJECTIVE)
+        if stemmed is not None:
+            stemmed = _remove(stemmed, PARTICIPLE) or stemmed
+        else:
+            stemmed = _remove(rv, VERB)
+            if stemmed is None:
+                stemmed = _remove(rv, NOUN)
+    if stemmed is not None:
+        rv = stemmed
+
+    # Шаг 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательный суффикс в R2
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(rv) - len(ending) >= r2:
+            rv = rv[:-len(ending)]
+            break
+
+    # Шаг 4
+    superlative = _remove(rv, SUPERLATIVE)
+    if superlative is not None:
+        rv = superlative
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif superlative is None and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
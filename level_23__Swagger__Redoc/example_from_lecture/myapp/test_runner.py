@@ -0,0 +1,19 @@
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Файлы метрик тестов пишутся во временный каталог, а не в общий METRICS_DIR."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = tempfile.TemporaryDirectory(prefix='metrics-')
+        self.metrics_settings = override_settings(METRICS_DIR=self.metrics_dir.name)
+        self.metrics_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.metrics_settings.disable()
+        self.metrics_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
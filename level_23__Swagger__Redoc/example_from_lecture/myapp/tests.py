@@ -1,3 +1,1031 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import re
+import tempfile
+from importlib import import_module
+from importlib.util import find_spec
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.handlers.base import BaseHandler
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections
+from django.db.transaction import TransactionManagementError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import ResolverMatch, reverse
+from rest_framework.renderers import JSONRenderer
+
+from . import async_views
+from .autocomplete import authors as author_index
+from .changes import read_changes
+from .models import Author, Book, BookDetail, ChangeSequence, Genre, ModelVersion, Tombstone, Trigram
+from .pagination import CachedCountPaginator
+from .renderers import FastJSONRenderer
+from .search import search_books
+from .serializers import BookSerializer
+from .routers import PIN_COOKIE, ReplicaMiddleware, force_primary, get_read_db
+from .querybudget import QueryBudgetExceeded, QueryRecorder, assert_query_budget, enforce_query_budgets
+
+
+class CatalogTestCase(TestCase):
+    """
+    Кэши общие для всех тестов, а версии моделей (ModelVersion) откатываются
+    вместе с транзакцией теста: без очистки ответ из одного теста мог бы
+    попасть в другой.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for cache in caches.all():
+            cache.clear()
+
+
+class KeysetPaginationTests(CatalogTestCase):
+    """Курсоры next/previous keyset-пагинации (myapp/pagination.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Автор')
+        # одинаковые годы: порядок внутри года задаёт id
+        cls.books = [Book.objects.create(author=author, title=f'Книга {i}', year_published=2000 + i % 3)
+                     for i in range(7)]
+        cls.expected = [book.pk for book in sorted(cls.books, key=lambda book: (book.year_published, book.pk))]
+
+    def get_page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_next_and_previous_round_trip(self):
+        pages = [self.get_page('/api/books/?page_size=3')]
+        while pages[-1]['next']:
+            pages.append(self.get_page(pages[-1]['next']))
+        self.assertEqual([book['id'] for page in pages for book in page['results']], self.expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.get_page(pages[-1]['previous'])
+        self.assertEqual(previous['results'], pages[-2]['results'])
+        self.assertEqual(self.get_page(previous['next'])['results'], pages[-1]['results'])
+
+    def test_malformed_cursor(self):
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        cursors = ['not base64!', encode([1, 2]), encode({'v': [2000]}), encode({'v': ['xx', 1]}),
+                   encode({'v': [2000, None]}), encode({'v': [2000, 2 ** 70]})]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/books/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
+
+class BulkBookTests(CatalogTestCase):
+    """Массовые create / update / delete книг (POST, PATCH, DELETE /api/books/bulk/)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Автор')
+        cls.book = Book.objects.create(author=cls.author, title='Книга', year_published=2000)
+
+    def send(self, method, data):
+        return getattr(self.client, method)('/api/books/bulk/', data=data, content_type='application/json')
+
+    def test_create(self):
+        response = self.send('post', [
+            {'title': 'Первая', 'year_published': 2001, 'author': self.author.pk},
+            {'title': 'Вторая', 'year_published': 2002, 'author': self.author.pk},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([book['title'] for book in response.json()], ['Первая', 'Вторая'])
+        self.assertEqual(Book.objects.count(), 3)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.books_count, 3)
+
+    def test_create_reports_errors_per_item(self):
+        response = self.send('post', [
+            {'title': 'Хорошая', 'year_published': 2001, 'author': self.author.pk},
+            {'title': 'Без автора', 'year_published': 2002, 'author': 999},
+            {'year_published': 'xx', 'author': self.author.pk},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertEqual(list(errors[1]), ['author'])
+        self.assertEqual(sorted(errors[2]), ['title', 'year_published'])
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_update(self):
+        response = self.send('patch', [{'id': self.book.pk, 'title': 'Новое название'}])
+        self.assertEqual(response.status_code, 200)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, 'Новое название')
+
+        response = self.send('patch', [{'title': 'Без id'}, {'id': 999, 'title': 'Нет такой'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([list(error) for error in response.json()], [['id'], ['id']])
+
+    def test_destroy(self):
+        response = self.send('delete', [self.book.pk, 999])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()[0], {})
+        self.assertTrue(Book.objects.exists())
+
+        self.assertEqual(self.send('delete', [self.book.pk]).status_code, 204)
+        self.assertFalse(Book.all_objects.exists())
+
+    def test_destroy_is_set_based(self):
+        response = self.send('post', [{'title': f'Роман {i}', 'year_published': 2000, 'author': self.author.pk}
+                                      for i in range(300)])
+        pks = [book['id'] for book in response.json()]
+        genre = Genre.objects.create(name='Жанр')
+        genre.books.add(*pks)
+        BookDetail.objects.create(book_id=pks[0], summary='Аннотация', page_count=10)
+        self.assertEqual(len(search_books('роман', 1000)), 300)
+
+        # число запросов не зависит от числа книг
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.send('delete', pks).status_code, 204)
+        self.assertLess(len(queries), 30)
+
+        self.assertFalse(Book.all_objects.filter(pk__in=pks).exists())
+        self.assertFalse(BookDetail.objects.exists())
+        self.assertEqual(Tombstone.objects.filter(label='myapp.book', object_id__in=pks).count(), 300)
+        self.assertEqual(search_books('роман', 1000), [])
+        self.assertFalse(Trigram.objects.filter(kind='b', object_id__in=pks).exists())
+        self.author.refresh_from_db()
+        genre.refresh_from_db()
+        self.assertEqual((self.author.books_count, genre.books_count), (1, 0))
+
+
+class BookShapeTests(CatalogTestCase):
+    """?fields= и ?expand= в API книг."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Автор')
+        cls.book = Book.objects.create(author=author, title='Книга', year_published=2000)
+        cls.book.genres.add(Genre.objects.create(name='Жанр'))
+
+    def test_fields_and_expand(self):
+        response = self.client.get('/api/books/', {'fields': 'id,author', 'expand': 'author'})
+        self.assertEqual(response.json()['results'], [
+            {'id': self.book.pk, 'author': {'id': self.book.author_id, 'name': 'Автор', 'books_count': 1}}])
+        response = self.client.get('/api/books/', {'fields': 'title,author'})
+        self.assertEqual(response.json()['results'], [{'title': 'Книга', 'author': self.book.author_id}])
+
+    def test_relation_in_fields_is_expanded(self):
+        response = self.client.get('/api/books/', {'fields': 'title,genres,detail'})
+        self.assertEqual(response.json()['results'], [
+            {'title': 'Книга', 'genres': [{'id': self.book.genres.get().pk, 'name': 'Жанр', 'books_count': 1}],
+             'detail': None}])
+
+    def test_unknown_fields(self):
+        response = self.client.get('/api/books/', {'fields': 'id,price', 'expand': 'title'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.json()), ['expand', 'fields'])
+
+
+class FastReadTests(CatalogTestCase):
+    """Быстрый путь list / retrieve (myapp/fastread.py) отдаёт то же, что BookSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Автор')
+        Book.objects.bulk_create([Book(author=author, title=f'Книга "{i}" ё', year_published=1990 + i % 3)
+                                  for i in range(5)])
+        cls.books = Book.objects.order_by('year_published', 'id')
+
+    def get(self, url):
+        # сериализатор на быстром пути не вызывается
+        with patch.object(BookSerializer, 'to_representation', side_effect=AssertionError):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_matches_serializer(self):
+        response = self.get('/api/books/')
+        expected = {'next': None, 'previous': None, 'results': BookSerializer(self.books, many=True).data}
+        self.assertEqual(response.content, response.accepted_renderer.render(expected))
+
+    def test_detail_matches_serializer(self):
+        book = self.books[0]
+        response = self.get(f'/api/books/{book.pk}/')
+        self.assertEqual(response.content, response.accepted_renderer.render(BookSerializer(book).data))
+
+    def test_malformed_pk(self):
+        for url in ('/api/books/abc/', '/api/authors/abc/', '/api/books/0/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ConditionalGetTests(CatalogTestCase):
+    """ETag / Last-Modified по версиям моделей (myapp/conditional.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create — без сигналов: иначе увеличение версии Author уже ждало бы
+        # commit транзакции теста, и следующее в ней не планировалось бы
+        Author.objects.bulk_create([Author(name='Автор')])
+
+    def test_not_modified_until_data_changes(self):
+        response = self.client.get('/api/authors/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/authors/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # версия увеличивается после commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.create(name='Новый')
+        response = self.client.get('/api/authors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_etag_depends_on_url_and_accept(self):
+        etag = self.client.get('/api/authors/')['ETag']
+        self.assertNotEqual(self.client.get('/api/authors/?page_size=1')['ETag'], etag)
+        response = self.client.get('/api/authors/', HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ExportTests(CatalogTestCase):
+    """Потоковая выгрузка каталога (GET /api/books/export/)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Автор, "с кавычками"')
+        cls.book = Book.objects.create(author=author, title='Книга', year_published=2000)
+        cls.book.genres.add(Genre.objects.create(name='Роман'), Genre.objects.create(name='Драма'))
+        Book.objects.create(author=author, title='Удалённая', year_published=2001, is_deleted=True)
+
+    def get_content(self, fmt):
+        response = self.client.get('/api/books/export/', {'format': fmt})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn(f'books.{fmt}', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.get_content('ndjson').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Книга')
+        self.assertEqual(rows[0]['author'], 'Автор, "с кавычками"')
+        self.assertEqual(sorted(rows[0]['genres']), ['Драма', 'Роман'])
+
+    def test_csv(self):
+        header, row = csv.reader(StringIO(self.get_content('csv')))
+        self.assertEqual(header, ['id', 'title', 'year_published', 'author_id', 'author', 'genres'])
+        self.assertEqual(row[:5], [str(self.book.pk), 'Книга', '2000', str(self.book.author_id),
+                                   'Автор, "с кавычками"'])
+        self.assertEqual(sorted(row[5].split('|')), ['Драма', 'Роман'])
+
+
+class ResponseCacheTests(CatalogTestCase):
+    """Кэш ответов с тегами-моделями (myapp/cache.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Author.objects.bulk_create([Author(name='Автор')])
+
+    def test_cached_until_write(self):
+        self.client.get('/api/authors/')
+        with self.assertNumQueries(1):  # только версии моделей
+            response = self.client.get('/api/authors/')
+        self.assertEqual([author['name'] for author in response.json()['results']], ['Автор'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/authors/', {'name': 'Новый'}, content_type='application/json')
+        response = self.client.get('/api/authors/')
+        self.assertEqual([author['name'] for author in response.json()['results']], ['Автор', 'Новый'])
+
+    def test_cached_response_is_conditional(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.create(name='Новый')
+        response = self.client.get('/api/authors/')
+        for header, value in (('HTTP_IF_NONE_MATCH', response['ETag']),
+                              ('HTTP_IF_MODIFIED_SINCE', response['Last-Modified'])):
+            with self.subTest(header=header), self.assertNumQueries(1):
+                self.assertEqual(self.client.get('/api/authors/', **{header: value}).status_code, 304)
+
+
+class CachedCountTests(CatalogTestCase):
+    """CachedCountPaginator: COUNT(*) кэшируется до изменения таблиц запроса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Автор')
+        Book.objects.bulk_create([Book(author=author, title=f'Книга {i}', year_published=2000)
+                                  for i in range(3)])
+
+    def count(self):
+        return CachedCountPaginator(Book.objects.order_by('id'), 2).count
+
+    def test_count_cached_until_write(self):
+        self.assertEqual(self.count(), 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.count(), 3)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.filter(title='Книга 0').update(is_deleted=True)
+            ModelVersion.bump(Book)
+        self.assertEqual(self.count(), 2)
+
+
+class BatchTests(CatalogTestCase):
+    """POST /api/batch/ и мультиполучение GET /api/books/?ids=."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Автор')
+        cls.books = [Book.objects.create(author=cls.author, title=f'Книга {i}', year_published=2000 + i)
+                     for i in range(3)]
+
+    def batch(self, requests):
+        response = self.client.post('/api/batch/', requests, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_mixed_sync_and_async_views(self):
+        book = self.books[0]
+        results = self.batch([
+            {'method': 'GET', 'path': f'/api/books/{book.pk}/'},
+            {'method': 'GET', 'path': f'/api/async/books/{book.pk}/'},
+            {'method': 'GET', 'path': '/api/async/authors/?page_size=1'},
+            {'method': 'PATCH', 'path': f'/api/books/{book.pk}/', 'body': {'title': 'Новое'}},
+            {'method': 'GET', 'path': '/api/async/books/999/'},
+        ])
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 200, 404])
+        self.assertEqual(results[1]['body'], results[0]['body'])
+        self.assertEqual(results[2]['body']['results'], [{'id': self.author.pk, 'name': 'Автор', 'books_count': 3}])
+        self.assertEqual(results[3]['body']['title'], 'Новое')
+
+    def test_invalid_items(self):
+        results = self.batch([
+            'GET /api/books/',
+            {'method': 'TRACE', 'path': '/api/books/'},
+            {'method': 'GET', 'path': '/admin/'},
+            {'method': 'POST', 'path': '/api/batch/'},
+            {'method': 'GET', 'path': '/api/nothing/'},
+        ])
+        self.assertEqual([result['status'] for result in results], [400, 405, 400, 400, 404])
+
+    def test_streaming_response_is_rejected(self):
+        # экспорт в batch недоступен (подзапрос принимает только JSON) — потоковая вью-заглушка
+        def view(request):
+            return StreamingHttpResponse(iter([b'{}\n'] * 10))
+        with patch('myapp.batch.resolve', return_value=ResolverMatch(view, (), {})):
+            [result] = self.batch([{'method': 'GET', 'path': '/api/books/stream/'}])
+        self.assertEqual(result, {'status': 501, 'headers': {},
+                                  'body': {'detail': 'Streaming responses cannot be batched.'}})
+
+    def test_multi_get(self):
+        ids = [self.books[2].pk, self.books[0].pk]
+        response = self.client.get('/api/books/', {'ids': ','.join(map(str, ids + [999]))})
+        self.assertEqual(sorted(book['id'] for book in response.json()['results']), sorted(ids))
+        self.assertEqual(self.client.get('/api/books/', {'ids': '1,x'}).status_code, 400)
+
+
+class IdempotencyTests(CatalogTestCase):
+    """Idempotency-Key (myapp/idempotency.py): повтор запроса получает сохранённый ответ."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Автор')
+
+    def post(self, key, title='Книга'):
+        return self.client.post('/api/books/', {'title': title, 'year_published': 2000, 'author': self.author.pk},
+                                content_type='application/json', headers={'Idempotency-Key': key})
+
+    def test_replay(self):
+        first = self.post('key-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first)
+
+        second = self.post('key-1')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Book.objects.filter(title='Книга').count(), 1)
+
+        self.assertEqual(self.post('key-2').status_code, 201)
+        self.assertEqual(Book.objects.filter(title='Книга').count(), 2)
+
+    def test_same_key_for_different_request(self):
+        self.assertEqual(self.post('key-1').status_code, 201)
+        response = self.post('key-1', title='Другая')
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Book.objects.filter(title='Другая').exists())
+
+    def test_key_length(self):
+        for key in ('', 'k' * 256):
+            with self.subTest(length=len(key)):
+                self.assertEqual(self.post(key).status_code, 400)
+        self.assertFalse(Book.objects.exists())
+        self.assertEqual(self.post('k' * 255).status_code, 201)
+
+
+class BinaryFormatTests(CatalogTestCase):
+    """JSON на orjson, MessagePack и CBOR (myapp/renderers.py) дают те же данные, что и JSON."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Автор \u2028 «Ё»')
+        Book.objects.create(author=cls.author, title='Книга', year_published=2000)
+
+    def test_fast_json_matches_drf(self):
+        data = {'name': 'Автор \u2028 «Ё»', 'items': [1, 2.5, None, True]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_fast_json_differences(self):
+        # целые длиннее 64 бит orjson не кодирует — ответ отдаёт JSONRenderer
+        data = {'big': 2 ** 70, 'negative': -2 ** 64}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        # NaN: null вместо ValueError (STRICT_JSON), см. докстринг FastJSONRenderer
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'value': float('nan')})
+        if find_spec('orjson') is not None:
+            self.assertEqual(FastJSONRenderer().render({'value': float('nan')}), b'{"value":null}')
+
+    def round_trip(self, module, media_type, dumps, loads):
+        if find_spec(module) is None:
+            self.skipTest(f'{module} не установлен')
+        module = import_module(module)
+        dumps, loads = getattr(module, dumps), getattr(module, loads)
+        expected = self.client.get('/api/books/').json()
+        response = self.client.get('/api/books/', HTTP_ACCEPT=media_type)
+        self.assertEqual(response['Content-Type'], media_type)
+        self.assertEqual(loads(response.content), expected)
+
+        body = {'title': 'Новая', 'year_published': 2001, 'author': self.author.pk}
+        response = self.client.post('/api/books/', dumps(body), content_type=media_type, HTTP_ACCEPT=media_type)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(loads(response.content), {'id': Book.objects.get(title='Новая').pk, **body})
+
+    def test_msgpack(self):
+        self.round_trip('msgpack', 'application/msgpack', 'packb', 'unpackb')
+
+    def test_cbor(self):
+        self.round_trip('cbor2', 'application/cbor', 'dumps', 'loads')
+
+
+class ChangeFeedTests(TransactionTestCase):
+    """Лента изменений /api/books/changes/ (myapp/changes.py) — в режиме autocommit, как в проде."""
+
+    def setUp(self):
+        self.author = Author.objects.create(name='Автор')
+        self.genre = Genre.objects.create(name='Жанр')
+        self.books = [Book.objects.create(author=self.author, title=f'Книга {i}', year_published=2000)
+                      for i in range(3)]
+
+    def read_all(self, token, limit=500):
+        """Все изменения после token, страницами по limit."""
+        pages = [read_changes(token, limit)]
+        while pages[-1]['has_more']:
+            pages.append(read_changes(pages[-1]['next_token'], limit))
+        return pages
+
+    def test_changes_in_sequence_order(self):
+        token = self.read_all(None)[-1]['next_token']
+        self.books[2].title = 'Изменена'
+        self.books[2].save()
+        self.books[0].title = 'Тоже изменена'
+        self.books[0].save()
+        self.assertEqual([book['id'] for book in read_changes(token, 10)['books']],
+                         [self.books[2].pk, self.books[0].pk])
+
+        pages = self.read_all(token, limit=1)
+        self.assertEqual([book['title'] for page in pages for book in page['books']],
+                         ['Изменена', 'Тоже изменена'])
+        self.assertEqual(read_changes(pages[-1]['next_token'], 10)['books'], [])
+
+    def test_deletions(self):
+        token = read_changes(None, 500)['next_token']
+        deleted_book, deleted_genre = self.books[1].pk, self.genre.pk
+        self.books[0].is_deleted = True
+        self.books[0].save()
+        self.books[1].delete()
+        self.genre.delete()
+        self.books[2].genres.add(Genre.objects.create(name='Новый'))
+
+        changes = read_changes(token, 500)
+        self.assertEqual(changes['deleted'], {'books': [deleted_book, self.books[0].pk],
+                                              'authors': [], 'genres': [deleted_genre]})
+        self.assertEqual([book['id'] for book in changes['books']], [self.books[2].pk])
+        self.assertEqual([genre['name'] for genre in changes['genres']], ['Новый'])
+
+    def test_update_fields_saves_change_seq(self):
+        token = read_changes(None, 500)['next_token']
+        book = self.books[0]
+        book.title = 'Только название'
+        book.save(update_fields=['title'])
+        self.assertEqual(Book.objects.get(pk=book.pk).change_seq, book.change_seq)
+        self.assertEqual([book['title'] for book in read_changes(token, 500)['books']], ['Только название'])
+
+    def test_sequence_taken_in_write_transaction(self):
+        value = ChangeSequence.objects.get(label='myapp.author').value
+        with self.assertRaises(IntegrityError):
+            Author.objects.create(name='Автор')
+        # номер выдавался в транзакции INSERT и откатился вместе с ней
+        self.assertEqual(ChangeSequence.objects.get(label='myapp.author').value, value)
+        with self.assertRaises(TransactionManagementError):
+            ChangeSequence.next(Author)
+
+
+class FuzzySearchTests(CatalogTestCase):
+    """Нечёткий поиск по триграммам (GET /api/search/fuzzy/)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Фёдор Достоевский')
+        Book.objects.create(author=cls.author, title='Идиот', year_published=1869)
+        Author.objects.create(name='Лев Толстой')
+
+    def test_typo_and_type(self):
+        results = self.client.get('/api/search/fuzzy/', {'q': 'Дестаевский'}).json()['results']
+        self.assertEqual([(item['type'], item['id']) for item in results], [('author', self.author.pk)])
+        results = self.client.get('/api/search/fuzzy/', {'q': 'Идиет', 'type': 'book'}).json()['results']
+        self.assertEqual([item['text'] for item in results], ['Идиот'])
+        self.assertEqual(self.client.get('/api/search/fuzzy/', {'q': 'x', 'type': 'film'}).status_code, 400)
+
+
+class FullTextSearchTests(CatalogTestCase):
+    """Полнотекстовый поиск со стеммингом (GET /api/books/search/)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Фёдор Достоевский')
+        cls.crime = Book.objects.create(author=author, title='Преступление и наказание', year_published=1866)
+        cls.idiot = Book.objects.create(author=author, title='Идиот', year_published=1869)
+        BookDetail.objects.create(book=cls.idiot, summary='Роман о наказании добротой', page_count=640)
+        cls.deleted = Book.objects.create(author=author, title='Наказание', year_published=1870, is_deleted=True)
+
+    def search(self, query, **params):
+        response = self.client.get('/api/books/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_stemmed_and_ranked(self):
+        # другая форма слова; совпадение в названии важнее совпадения в аннотации
+        results = self.search('наказания')['results']
+        self.assertEqual([book['id'] for book in results], [self.crime.pk, self.idiot.pk])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertEqual([book['id'] for book in self.search('достоевского')['results']],
+                         [self.crime.pk, self.idiot.pk])
+
+    def test_index_follows_changes(self):
+        self.crime.title = 'Бесы'
+        self.crime.save()
+        self.assertEqual([book['id'] for book in self.search('бесов')['results']], [self.crime.pk])
+        self.assertEqual(self.search('преступление')['results'], [])
+
+    def test_paging_and_shape(self):
+        page = self.search('наказание', limit=1, fields='id')
+        self.assertEqual(page['results'], [{'id': self.crime.pk, 'score': page['results'][0]['score']}])
+        self.assertEqual(self.client.get(page['next']).json()['results'][0]['id'], self.idiot.pk)
+        self.assertEqual(self.client.get('/api/books/search/').status_code, 400)
+
+
+class AutocompleteTests(CatalogTestCase):
+    """Подсказки авторов по префиксу из индекса в памяти (myapp/autocomplete.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create: без сигналов, отложенные bump() не заслоняют версии в тестах
+        cls.author, _ = Author.objects.bulk_create([Author(name='Фёдор Достоевский'), Author(name='Лев Толстой')])
+
+    def setUp(self):
+        super().setUp()
+        # индекс живёт в памяти процесса и пережил бы откат данных прошлого теста
+        author_index.stamp = None
+
+    def suggest(self, prefix):
+        response = self.client.get('/api/authors/autocomplete/', {'q': prefix})
+        return [author['name'] for author in response.json()['results']]
+
+    def test_prefix_of_any_word(self):
+        self.assertEqual(self.suggest('дост'), ['Фёдор Достоевский'])
+        self.assertEqual(self.suggest('Федор Д'), ['Фёдор Достоевский'])
+        self.assertEqual(self.suggest('т'), ['Лев Толстой'])
+        self.assertEqual(self.suggest('  '), [])
+
+    def test_answers_from_memory_and_follows_writes(self):
+        self.suggest('л')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('лев'), ['Лев Толстой'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.create(name='Лев Гумилёв')
+            self.author.name = 'Фёдор Михайлович Достоевский'
+            self.author.save()
+        self.assertEqual(self.suggest('лев'), ['Лев Гумилёв', 'Лев Толстой'])
+        self.assertEqual(self.suggest('мих'), ['Фёдор Михайлович Достоевский'])
+
+    def test_book_writes_do_not_rebuild_index(self):
+        self.suggest('л')
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(author=self.author, title='Идиот', year_published=1869)
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+        # версия Author выросла (books_count), версия имён — нет
+        author_index.checked = 0
+        with patch.object(author_index, 'build', side_effect=AssertionError):
+            self.assertEqual(self.suggest('дост'), ['Фёдор Достоевский'])
+
+
+class FacetTests(CatalogTestCase):
+    """Фильтры ?author= / ?genre= / ?decade= и фасеты ?facets= списка книг (myapp/facets.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tolstoy = Author.objects.create(name='Толстой')
+        cls.chekhov = Author.objects.create(name='Чехов')
+        cls.novel = Genre.objects.create(name='Роман')
+        cls.drama = Genre.objects.create(name='Драма')
+        war = Book.objects.create(author=cls.tolstoy, title='Война и мир', year_published=1869)
+        anna = Book.objects.create(author=cls.tolstoy, title='Анна Каренина', year_published=1877)
+        gull = Book.objects.create(author=cls.chekhov, title='Чайка', year_published=1896)
+        war.genres.add(cls.novel)
+        anna.genres.add(cls.novel, cls.drama)
+        gull.genres.add(cls.drama)
+
+    def get(self, **params):
+        response = self.client.get('/api/books/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_facets(self):
+        facets = self.get(facets='genre,decade,author')['facets']
+        self.assertEqual(facets['genre'], [{'id': self.drama.pk, 'name': 'Драма', 'count': 2},
+                                           {'id': self.novel.pk, 'name': 'Роман', 'count': 2}])
+        self.assertEqual(facets['decade'], [{'decade': 1860, 'count': 1}, {'decade': 1870, 'count': 1},
+                                            {'decade': 1890, 'count': 1}])
+        self.assertEqual(facets['author'], [{'id': self.tolstoy.pk, 'name': 'Толстой', 'count': 2},
+                                            {'id': self.chekhov.pk, 'name': 'Чехов', 'count': 1}])
+
+    def test_decades_before_year_zero(self):
+        Book.objects.bulk_create([Book(author=self.tolstoy, title=f'Свиток {year}', year_published=year)
+                                  for year in (-15, -10, -5, 5)])
+        facets = self.get(facets='decade')['facets']['decade']
+        self.assertEqual({item['decade']: item['count'] for item in facets if item['decade'] < 10},
+                         {-20: 1, -10: 2, 0: 1})
+        for decade, titles in ((-10, ['Свиток -10', 'Свиток -5']), (-7, ['Свиток -10', 'Свиток -5']),
+                               (0, ['Свиток 5'])):
+            with self.subTest(decade=decade):
+                data = self.get(decade=decade)
+                self.assertEqual(sorted(book['title'] for book in data['results']), titles)
+
+    def test_facets_follow_filters(self):
+        data = self.get(genre=self.drama.pk, facets='author,decade')
+        self.assertEqual(sorted(book['title'] for book in data['results']), ['Анна Каренина', 'Чайка'])
+        self.assertEqual([item['count'] for item in data['facets']['author']], [1, 1])
+        data = self.get(author=self.tolstoy.pk, decade=1875, facets='genre')
+        self.assertEqual([book['title'] for book in data['results']], ['Анна Каренина'])
+        self.assertEqual([item['name'] for item in data['facets']['genre']], ['Драма', 'Роман'])
+
+    def test_invalid_params(self):
+        for params in ({'facets': 'price'}, {'genre': 'x'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/books/', params).status_code, 400)
+
+
+@enforce_query_budgets
+class QueryBudgetTests(TestCase):
+    """Страницы укладываются в объявленный у вью бюджет запросов (query_budget)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='secret')
+        for i in range(10):
+            author = Author.objects.create(name=f'Автор {i}')
+            Book.objects.create(author=author, title=f'Книга {i}', year_published=2000 + i)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_views_within_budget(self):
+        urls = [reverse('book_list'), reverse('author_list'), reverse('edit_all_books'),
+                '/api/books/', '/api/authors/']
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_book_list_without_n_plus_one(self):
+        with assert_query_budget(10, 'book_list') as recorder:
+            self.client.get(reverse('book_list'))
+        self.assertEqual(recorder.find_repeated(), [])
+
+    def test_detects_n_plus_one_with_call_site(self):
+        with QueryRecorder() as recorder:
+            [book.author.name for book in Book.objects.all()]
+        [(shape, queries)] = recorder.find_repeated()
+        self.assertIn('"myapp_author"', shape)
+        self.assertEqual(len(queries), 10)
+        # место вызова записывается с QUERY_BUDGET_REPEAT_THRESHOLD-го повтора
+        self.assertIsNone(queries[0].call_site)
+        self.assertIn('myapp/tests.py', queries[-1].call_site)
+
+    def test_bulk_create_batches_are_not_n_plus_one(self):
+        with QueryRecorder() as recorder:
+            Genre.objects.bulk_create([Genre(name=f'Жанр {i}') for i in range(10)], batch_size=2)
+            for i in range(5):
+                Genre.objects.create(name=f'Одиночный {i}')
+        inserts = [(shape, len(queries)) for shape, queries in recorder.find_repeated()
+                   if shape.startswith('INSERT INTO "myapp_genre"')]
+        # пять одиночных INSERT — N+1, пять одинаковых пачек по 2 строки — нет
+        self.assertEqual(len(inserts), 1)
+        self.assertNotIn('), (', inserts[0][0])
+        self.assertEqual(inserts[0][1], 5)
+
+    def test_budget_exceeded(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(1):
+                list(Author.objects.all())
+                list(Book.objects.all())
+
+
+class MetricsTests(TestCase):
+    """Метрики Prometheus (myapp/metrics.py) пишутся в METRICS_DIR и суммируются в /metrics."""
+
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(self.settings(METRICS_DIR=self.directory))
+
+    def test_request_is_counted(self):
+        Author.objects.create(name='Автор')
+        self.client.get('/api/authors/')
+        self.assertEqual([path.name for path in self.directory.iterdir()], [f'{os.getpid()}.db'])
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('http_responses_total{view="author-list",method="GET",status="200"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="author-list"} 1', text)
+        self.assertRegex(text, r'db_queries_total\{view="author-list",method="GET"\} [1-9]')
+
+    def test_tests_do_not_use_shared_directory(self):
+        # TEST_RUNNER подменяет общий каталог временным
+        self.assertNotEqual(Path(settings.METRICS_DIR), Path(tempfile.gettempdir()) / 'm3_fullstack_metrics')
+
+
+class AsyncMiddlewareTests(TestCase):
+    """Middleware проекта не переводят async-вью в поток, а запросы к базе в sync_to_async видят."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Author.objects.bulk_create([Author(name=f'Автор {i}') for i in range(3)])
+
+    @override_settings(DEBUG=True)
+    def test_async_chain_is_not_adapted(self):
+        handler = BaseHandler()
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            handler.load_middleware(is_async=True)
+        self.assertTrue(iscoroutinefunction(handler._middleware_chain))
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+    async def test_async_view_queries_are_counted(self):
+        response = await self.async_client.get('/api/async/authors/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertRegex(response['Server-Timing'], r'db;desc="[1-9]\d* queries"')
+
+    @enforce_query_budgets
+    async def test_async_view_budget(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with patch.object(async_views.author_list, 'query_budget', 0, create=True):
+                await self.async_client.get('/api/async/authors/')
+
+
+@enforce_query_budgets
+class WriteQueryBudgetTests(TransactionTestCase):
+    """
+    Запись через API укладывается в бюджет. TransactionTestCase: как в проде,
+    после commit выполняются и отложенные запросы (версии моделей).
+    """
+
+    def test_writes_within_budget(self):
+        author = Author.objects.create(name='Автор')
+        response = self.client.post('/api/books/', {'title': 'Книга', 'year_published': 2000, 'author': author.pk},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        url = f'/api/books/{response.json()["id"]}/'
+        requests = [
+            ('put', url, {'title': 'Книга', 'year_published': 2001, 'author': author.pk}),
+            ('patch', url, {'title': 'Другая'}),
+            ('delete', url, None),
+            ('post', '/api/authors/', {'name': 'Новый'}),
+            ('patch', f'/api/authors/{author.pk}/', {'name': 'Переименован'}),
+            ('delete', f'/api/authors/{author.pk}/', None),
+        ]
+        for method, url, data in requests:
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(url, data, content_type='application/json')
+                self.assertLess(response.status_code, 300)
+
+
+class SoftDeleteTests(TestCase):
+    """Мягко удалённые книги скрыты менеджером по умолчанию и не попадают в частичные индексы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='Автор')
+        cls.live = Book.objects.create(author=cls.author, title='Живая', year_published=2001)
+        cls.deleted = Book.objects.create(author=cls.author, title='Удалённая', year_published=2002,
+                                          is_deleted=True)
+        BookDetail.objects.create(book=cls.deleted, summary='Кратко', page_count=10)
+
+    def test_default_manager_hides_deleted(self):
+        self.assertEqual(list(Book.objects.all()), [self.live])
+        self.assertEqual(list(self.author.books.all()), [self.live])
+        self.assertEqual(Book.all_objects.count(), 2)
+        self.assertEqual(self.client.get(f'/api/books/{self.deleted.pk}/').status_code, 404)
+
+    def test_live_queries_use_partial_index(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('Частичные индексы поддерживают SQLite и PostgreSQL')
+        plans = {
+            'book_live_year_id_idx': Book.objects.order_by('year_published', 'id')[:20],
+            'book_live_author_idx': Book.objects.filter(author=self.author).order_by('year_published', 'id')[:20],
+        }
+        for index, queryset in plans.items():
+            with self.subTest(index=index):
+                # на маленькой таблице PostgreSQL иначе выбрал бы Seq Scan
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET LOCAL enable_seqscan = off')
+                self.assertIn(index, queryset.explain())
+        self.assertNotIn('book_live_', Book.all_objects.order_by('year_published', 'id')[:20].explain())
+
+    def test_purge_archives_and_deletes(self):
+        with tempfile.NamedTemporaryFile('r', suffix='.ndjson', encoding='utf-8') as archive:
+            call_command('purge_deleted_books', archive=archive.name, chunk_size=1, stdout=StringIO())
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual([row['id'] for row in rows], [self.deleted.pk])
+        self.assertEqual(rows[0]['detail'], {'summary': 'Кратко', 'page_count': 10})
+        self.assertEqual(list(Book.all_objects.all()), [self.live])
+
+
+class BooksCountTests(TestCase):
+    """Счётчики books_count следуют за книгами (myapp/counters.py)."""
+
+    def assertCounts(self, author, genre, expected):
+        author.refresh_from_db()
+        genre.refresh_from_db()
+        self.assertEqual((author.books_count, genre.books_count), expected)
+
+    def test_counts_follow_books(self):
+        author = Author.objects.create(name='Автор')
+        other = Author.objects.create(name='Другой')
+        genre = Genre.objects.create(name='Жанр')
+        book = Book.objects.create(author=author, title='Книга', year_published=2000)
+        book.genres.add(genre)
+        self.assertCounts(author, genre, (1, 1))
+        book.is_deleted = True
+        book.save()
+        self.assertCounts(author, genre, (0, 0))
+        book.is_deleted = False
+        book.author = other
+        book.save()
+        self.assertCounts(author, genre, (0, 1))
+        genre.books.remove(book)
+        self.assertCounts(other, genre, (1, 0))
+        book.delete()
+        self.assertCounts(other, genre, (0, 0))
+
+    def test_verify_repairs_drift(self):
+        author = Author.objects.create(name='Автор')
+        Book.objects.create(author=author, title='Книга', year_published=2000)
+        Author.objects.update(books_count=5)
+        call_command('verify_books_count', repair=True, chunk_size=1, stdout=StringIO())
+        author.refresh_from_db()
+        self.assertEqual(author.books_count, 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Чтение с реплики, запись и чтение после записи — из основной базы (myapp/routers.py)."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='secret')
+        self.client.force_login(self.user)
+        Author.objects.create(name='Автор')
+
+    def get_queries(self, method, url, **kwargs):
+        """Ответ и число запросов к таблицам myapp в основной базе и на реплике."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(url, **kwargs)
+
+        def count(queries):
+            return sum('"myapp_' in query['sql'] for query in queries)
+        return response, count(primary.captured_queries), count(replica.captured_queries)
+
+    def test_reads_go_to_replica(self):
+        response, primary, replica = self.get_queries('get', '/api/authors/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_reads_after_write_stick_to_primary(self):
+        response, primary, replica = self.get_queries(
+            'post', '/api/authors/', data={'name': 'Новый'}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(replica, 0)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        _, primary, replica = self.get_queries('get', '/api/authors/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_async_view_reads_go_to_replica(self):
+        # запросы async-вью выполняются в потоке sync_to_async, состояние запроса — в контексте
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = async_to_sync(self.async_client.get)('/api/async/authors/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('"myapp_' in query['sql'] for query in primary.captured_queries))
+        self.assertTrue(any('"myapp_' in query['sql'] for query in replica.captured_queries))
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'replica_2', 'replica_3'])
+    def test_one_replica_per_request(self):
+        def view(request):
+            return HttpResponse(' '.join({get_read_db() for _ in range(20)}))
+        for _ in range(5):
+            response = ReplicaMiddleware(view)(RequestFactory().get('/'))
+            self.assertEqual(len(response.content.split()), 1)
+
+    def test_force_primary(self):
+        _, primary, replica = self.get_queries('get', reverse('edit_all_books'))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_outside_request_uses_primary(self):
+        self.assertEqual(get_read_db(), 'default')
+        with force_primary():
+            self.assertEqual(get_read_db(), 'default')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'настройки SQLite')
+class SQLiteOptionsTests(TestCase):
+    """Новое соединение с файлом базы получает PRAGMA из settings.SQLITE_OPTIONS."""
+
+    def test_new_connection_pragmas(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        wrapper = connections['default'].__class__(
+            {**connection.settings_dict, 'NAME': str(Path(directory) / 'db.sqlite3')}, alias='sqlite_options')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            pragmas = {}
+            for name in ('journal_mode', 'synchronous', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {name}')
+                pragmas[name] = cursor.fetchone()[0]
+        busy_timeout = int(re.search(r'busy_timeout=(\d+)', settings.SQLITE_OPTIONS['init_command'])[1])
+        # synchronous: 1 — NORMAL
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': busy_timeout})
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+
+
+class ImportBooksTests(TestCase):
+    """manage.py import_books: JSON-массив в формате BOOKS_DATA."""
+    books = [
+        {'author': 'Лев Толстой', 'title': 'Война и мир', 'year_published': 1869,
+         'summary': 'Роман', 'page_count': 1225, 'genres': ['Роман', 'Классика']},
+        {'author': 'Лев Толстой', 'title': 'Анна Каренина', 'year_published': 1877,
+         'summary': 'Роман', 'page_count': 864, 'genres': ['Роман']},
+        {'author': '', 'title': 'Без автора', 'year_published': 1900},
+    ]
+
+    def test_import_and_skip_existing(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8') as file:
+            json.dump(self.books, file, ensure_ascii=False)
+            file.flush()
+            call_command('import_books', file.name, stdout=StringIO(), stderr=StringIO())
+            call_command('import_books', file.name, stdout=StringIO(), stderr=StringIO())
+
+        author = Author.objects.get(name='Лев Толстой')
+        self.assertEqual(author.books_count, 2)
+        self.assertEqual(Genre.objects.get(name='Роман').books_count, 2)
+        book = Book.objects.get(title='Война и мир')
+        self.assertEqual(book.detail.page_count, 1225)
+        self.assertEqual(sorted(book.genres.values_list('name', flat=True)), ['Классика', 'Роман'])
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_soft_deleted_book_is_not_reimported(self):
+        author = Author.objects.create(name='Лев Толстой')
+        Book.objects.create(author=author, title='Война и мир', year_published=1869, is_deleted=True)
+        with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8') as file:
+            json.dump(self.books[:1], file, ensure_ascii=False)
+            file.flush()
+            call_command('import_books', file.name, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(Book.all_objects.filter(title='Война и мир').count(), 1)
+        self.assertFalse(Book.objects.exists())
@@ -0,0 +1,199 @@
+"""
+Счётчики времени текущего запроса: запросы к базе, рендеринг шаблонов,
+сериализация, кодирование ответа. Заполняются дешёвыми таймерами
+(perf_counter) и читаются метриками (myapp/metrics.py) и заголовком
+Server-Timing (ServerTimingMiddleware).
+
+Шаблоны измеряются бэкендом TimedDjangoTemplates (settings.TEMPLATES),
+сериализаторы — TimedDataMixin (myapp/serializers.py) и ValuesReadMixin,
+кодирование — рендерерами DRF (myapp/renderers.py). Время запросов к базе
+внутри этих блоков в них не входит, оно учитывается только в "db".
+
+Соединения с базой у Django свои в каждом потоке, а под ASGI запросы
+к базе выполняются в потоке sync_to_async. Поэтому обёртки запросов
+(execute_wrapper) хранятся не в соединении, а в contextvar текущего
+запроса: context_execute_wrapper() — и их видят соединения любого потока,
+куда передан контекст запроса.
+"""
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = ContextVar('request_timings', default=None)
+_execute_wrappers = ContextVar('execute_wrappers', default=())
+
+
+def dispatch_execute(execute, sql, params, many, context):
+    """execute_wrapper каждого соединения: вызывает обёртки текущего контекста."""
+    for wrapper in reversed(_execute_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_dispatch(connection, **kwargs):
+    """Обработчик connection_created (MyappConfig.ready)."""
+    if dispatch_execute not in connection.execute_wrappers:
+        # в начало: connection.execute_wrapper() снимает последнюю обёртку через pop()
+        connection.execute_wrappers.insert(0, dispatch_execute)
+
+
+@contextmanager
+def context_execute_wrapper(wrapper):
+    """Как connection.execute_wrapper(), но для всех соединений и потоков текущего контекста."""
+    token = _execute_wrappers.set((*_execute_wrappers.get(), wrapper))
+    try:
+        yield
+    finally:
+        _execute_wrappers.reset(token)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.totals = defaultdict(float)
+        self.view_start = self.view_end = None
+        self._depth = defaultdict(int)
+        self._stack = ExitStack()
+        self._token = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_count += 1
+            self.db_time += time.perf_counter() - start
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self._stack.enter_context(context_execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        _current.reset(self._token)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing; mw + db + view + serialize + render + encode = total."""
+        total = self.elapsed
+        app = self.view_end - self.view_start if self.view_start and self.view_end else total
+        sections = [(name, self.totals.get(name, 0.0)) for name in ('serialize', 'render', 'encode')]
+        view = max(app - self.db_time - sum(duration for _, duration in sections), 0.0)
+        metrics = [
+            f'mw;dur={(total - app) * 1000:.1f}',
+            f'db;desc="{self.db_count} queries";dur={self.db_time * 1000:.1f}',
+            f'view;dur={view * 1000:.1f}',
+            *(f'{name};dur={duration * 1000:.1f}' for name, duration in sections if duration),
+            f'total;dur={total * 1000:.1f}',
+        ]
+        return ', '.join(metrics)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def measure(name):
+    """
+    Добавляет время блока (без запросов к базе) к счётчику `name` текущего запроса.
+    Вложенные блоки с тем же именем не суммируются. Работает и как декоратор.
+    """
+    timings = _current.get()
+    if timings is None or timings._depth[name]:
+        yield
+        return
+    timings._depth[name] += 1
+    start = time.perf_counter()
+    db_start = timings.db_time
+    try:
+        yield
+    finally:
+        timings.totals[name] += time.perf_counter() - start - (timings.db_time - db_start)
+        timings._depth[name] -= 1
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with measure('render'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates, который учитывает время рендеринга шаблонов."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class ServerTimingMiddleware:
+    """
+    Заголовок Server-Timing с разбивкой времени ответа (видна в DevTools браузера).
+
+    Добавляется к доле ответов SERVER_TIMING_SAMPLE_RATE (0 — выключено).
+    Использует счётчики MetricsMiddleware, поэтому стоит сразу после него.
+    """
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # синхронный process_view Django выполнил бы в потоке через sync_to_async
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        timings = self.sample()
+        if timings is None:
+            return self.get_response(request)
+        return self.add_header(self.get_response(request), timings)
+
+    async def acall(self, request):
+        timings = self.sample()
+        if timings is None:
+            return await self.get_response(request)
+        return self.add_header(await self.get_response(request), timings)
+
+    @staticmethod
+    def sample():
+        timings = current()
+        rate = settings.SERVER_TIMING_SAMPLE_RATE
+        if timings is None or not rate or (rate < 1 and random.random() >= rate):
+            return None
+        return timings
+
+    @staticmethod
+    def add_header(response, timings):
+        timings.view_end = time.perf_counter()
+        response['Server-Timing'] = timings.server_timing()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view()
+
+    @staticmethod
+    def start_view():
+        timings = current()
+        if timings is not None:
+            timings.view_start = time.perf_counter()
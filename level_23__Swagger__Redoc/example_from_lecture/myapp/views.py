@@ -2,17 +2,29 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views.generic import (ListView, CreateView, UpdateView,
                                   DetailView, DeleteView)
 from rest_framework.response import Response
 
 from myapp.models import Author, Book
+from .cache import cache_response
 from .forms import BookForm, BookDetailForm
+from .pagination import CachedCountPaginator
+from .querybudget import query_budget
+from .routers import force_primary
 from django.contrib import messages
 
 
+@method_decorator(cache_response(Book, Author), name='dispatch')
 class BookView(LoginRequiredMixin, ListView):
     model = Book
+    # шаблон выводит book.author.name в каждой строке
+    queryset = Book.objects.select_related('author')
+    query_budget = 10
+    ordering = ['id']
+    paginate_by = 10
+    paginator_class = CachedCountPaginator
 
     # def get(self, request, *args, **kwargs):
     #     messages.info(request, "Это сообщение для GET-запроса.")
@@ -74,6 +86,7 @@ class BookUpdateView(UpdateView):
 
 class BookDetailView(DetailView):
     model = Book
+    query_budget = 6
     template_name = 'myapp/book_detail.html'
     context_object_name = 'book'
 
@@ -85,8 +98,10 @@ class BookDeleteView(DeleteView):
     context_object_name = 'book'
 
 
+@method_decorator(cache_response(Author), name='dispatch')
 class AuthorListView(ListView):
     model = Author
+    query_budget = 5
     template_name = 'myapp/author_list.html'
     context_object_name = 'authors'
 
@@ -95,6 +110,7 @@ from .forms import AuthorForm, BookFormSet, BookModelFormSet
 
 
 @login_required()
+@force_primary()
 def author_edit(request, pk):
     author = get_object_or_404(Author, pk=pk)
     if request.method == 'POST':
@@ -110,29 +126,314 @@ def author_edit(request, pk):
     return render(request, 'myapp/author_edit.html', {'form': form, 'formset': formset})
 
 
+@query_budget(5)
+@force_primary()  # формы сохраняют все строки обратно — читаем без отставания реплики
 def edit_all_books(request):
     if request.method == "POST":
-        formset = BookModelFormSet(request.POST, queryset=Book.objects.all())
+        formset = BookModelFormSet(request.POST, queryset=Book.objects.select_related('author'))
         if formset.is_valid():
             formset.save()
             return redirect("edit_all_books")  # Перезагрузка страницы после сохранения
     else:
-        formset = BookModelFormSet(queryset=Book.objects.all())
+        formset = BookModelFormSet(queryset=Book.objects.select_related('author'))
 
     return render(request, "myapp/edit_all_books.html", {"formset": formset})
 
 #
-from rest_framework import viewsets, generics
-from .models import Book, Author
-from .serializers import BookSerializer, AuthorSerializer
+import csv
 
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, generics, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+from .autocomplete import authors as author_index
+from .changes import read_changes
+from .conditional import conditional_view
+from .facets import BookFilter, get_facets, parse_facets
+from .fastread import ValuesReadMixin
+from .fuzzy import TYPES, suggest
+from .idempotency import idempotent
+from .models import Book, Author, BookDetail, Genre
+from .pagination import BookKeysetPagination, AuthorKeysetPagination
+from .renderers import CSVRenderer, Echo, NDJSONRenderer, dump_ndjson_row
+from .search import search_books
+from .serializers import BookSerializer, AuthorSerializer, to_pk
 
-class BookViewSet(viewsets.ModelViewSet):
+
+def get_int_param(request, name, default, minimum, maximum=None):
+    """Целый параметр запроса (?limit=, ?offset=), приведённый к [minimum, maximum]."""
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise ValidationError({name: ['A valid integer is required.']})
+    value = max(value, minimum)
+    return value if maximum is None else min(value, maximum)
+
+
+@method_decorator(cache_response(Book, Author, Genre, BookDetail), name='dispatch')
+@method_decorator(idempotent, name='dispatch')
+class BookViewSet(ValuesReadMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    pagination_class = BookKeysetPagination
+    filter_backends = [BookFilter]
+    # запись: сама строка, номер изменения, счётчики, поисковые индексы, версии моделей
+    # (замерено в autocommit, с запасом на первые строки ChangeSequence/ModelVersion);
+    # массовые операции — число запросов растёт с числом пачек
+    query_budget = {'default': 8, 'create': 24, 'update': 24, 'partial_update': 24, 'destroy': 26,
+                    'bulk': None, 'bulk_update': None, 'bulk_destroy': None}
+    bulk_max_items = 10000
+    export_chunk_size = 2000
+    changes_limit = 500
+    changes_max_limit = 1000
+    search_limit = 20
+    search_max_limit = 100
+    export_columns = ['id', 'title', 'year_published', 'author_id', 'author', 'genres']
+
+    def get_shape(self):
+        """Форма ответа из ?fields= / ?expand= (только для чтения)."""
+        if not hasattr(self, '_shape'):
+            self._shape = (None, [])
+            if self.request.method == 'GET':
+                self._shape = self.get_serializer_class().parse_shape(self.request.query_params)
+        return self._shape
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list' and 'ids' in self.request.query_params:
+            queryset = queryset.filter(pk__in=self.get_requested_ids())
+        if self.action in ('list', 'retrieve', 'search'):
+            fields, expand = self.get_shape()
+            ordering = getattr(self.paginator, 'ordering', ())
+            queryset = self.get_serializer_class().optimize_queryset(
+                queryset, fields, expand,
+                extra_fields=[field.lstrip('-') for field in ordering])
+        return queryset
+
+    def get_requested_ids(self):
+        """?ids=1,2,3 — несколько книг одним запросом WHERE id IN (...)."""
+        values = [value for value in self.request.query_params['ids'].split(',') if value.strip()]
+        pks = [to_pk(value) for value in values]
+        if None in pks:
+            raise ValidationError({'ids': ['A comma-separated list of integers is required.']})
+        if len(pks) > self.paginator.max_page_size:
+            raise ValidationError({'ids': [f'Ensure no more than {self.paginator.max_page_size} ids.']})
+        return pks
+
+    @conditional_view(Book, Author, Genre, BookDetail)
+    def list(self, request, *args, **kwargs):
+        """
+        Список книг. Фильтры: ?author=, ?genre=, ?decade=.
+        ?facets=genre,decade,author добавляет в ответ количество книг
+        по каждому фасету для этих фильтров (myapp/facets.py).
+        """
+        facets = parse_facets(request.query_params.get('facets'))
+        response = super().list(request, *args, **kwargs)
+        if facets and isinstance(response.data, dict):
+            response.data['facets'] = get_facets(self.filter_queryset(self.get_queryset()), facets)
+        return response
+
+    @conditional_view(Book, Author, Genre, BookDetail)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_shape()
+        kwargs.setdefault('fields', fields)
+        kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Создать список книг одним запросом (POST /api/books/bulk/)."""
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=self.bulk_max_items)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        """Частично обновить список книг; каждый элемент должен содержать `id`."""
+        serializer = self.get_serializer(
+            self.get_queryset(), data=request.data, many=True, partial=True,
+            max_length=self.bulk_max_items)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data)
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        """Удалить книги по списку id, переданному в теле запроса."""
+        if not isinstance(request.data, list):
+            return Response(
+                {'non_field_errors': ['Expected a list of ids.']},
+                status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.bulk_max_items:
+            return Response(
+                {'non_field_errors': [f'Ensure this field has no more than {self.bulk_max_items} elements.']},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        pks = [to_pk(value) for value in request.data]
+        existing = set(self.get_queryset().filter(pk__in={pk for pk in pks if pk is not None})
+                       .values_list('pk', flat=True))
+        errors = [
+            {} if pk in existing else {'id': [f'Invalid pk "{value}" - object does not exist.']}
+            for pk, value in zip(pks, request.data)
+        ]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            self.get_serializer(many=True).destroy(existing)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Выгрузка всего каталога (GET /api/books/export/?format=ndjson|csv).
+
+        Строки читаются через iterator(chunk_size=...), автор и жанры
+        подгружаются на каждую пачку, и ответ отдаётся потоком —
+        потребление памяти не зависит от размера таблицы.
+        """
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .select_related('author')
+            .prefetch_related(Prefetch('genres', queryset=Genre.objects.only('name')))
+            .only('id', 'title', 'year_published', 'author__name')
+            .order_by('id')
+        )
+        rows = (self.get_export_row(book) for book in queryset.iterator(chunk_size=self.export_chunk_size))
+
+        if request.accepted_renderer.format == 'csv':
+            writer = csv.writer(Echo())
+            content = (writer.writerow(row) for row in self._csv_rows(rows))
+            filename = 'books.csv'
+        else:
+            content = (dump_ndjson_row(row) for row in rows)
+            filename = 'books.ndjson'
 
+        response = StreamingHttpResponse(content, content_type=request.accepted_renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
-class AuthorViewSet(viewsets.ModelViewSet):
+    def get_export_row(self, book):
+        return {
+            'id': book.id,
+            'title': book.title,
+            'year_published': book.year_published,
+            'author_id': book.author_id,
+            'author': book.author.name,
+            'genres': [genre.name for genre in book.genres.all()],
+        }
+
+    def _csv_rows(self, rows):
+        yield self.export_columns
+        for row in rows:
+            row['genres'] = '|'.join(row['genres'])
+            yield [row[name] for name in self.export_columns]
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Лента изменений для синхронизации (GET /api/books/changes/?since=<token>).
+
+        Возвращает книги, авторов и жанры, изменённые после токена,
+        id удалённых объектов и `next_token` для следующего запроса.
+        Без `since` — полная выгрузка с начала; пока `has_more` истинно,
+        нужно запрашивать дальше с `next_token`.
+        """
+        limit = get_int_param(request, 'limit', self.changes_limit, 1, self.changes_max_limit)
+        return Response(read_changes(request.query_params.get('since'), limit))
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Полнотекстовый поиск (GET /api/books/search/?q=...&limit=&offset=).
+
+        Ищет по названию, аннотации, автору и жанрам через индекс
+        (myapp/search.py); результаты отсортированы по релевантности,
+        у каждой книги есть поле `score`. Поддерживает ?fields= / ?expand=.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': ['This field is required.']})
+        limit = get_int_param(request, 'limit', self.search_limit, 1, self.search_max_limit)
+        offset = get_int_param(request, 'offset', 0, 0)
+
+        hits = search_books(query, limit + 1, offset)
+        has_more = len(hits) > limit
+        hits = hits[:limit]
+        books = self.get_queryset().in_bulk([pk for pk, _ in hits])
+        ranked = [(books[pk], score) for pk, score in hits if pk in books]
+        results = self.get_serializer([book for book, _ in ranked], many=True).data
+        for item, (_, score) in zip(results, ranked):
+            item['score'] = score
+        next_url = None
+        if has_more:
+            next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + limit)
+        return Response({'next': next_url, 'results': results})
+
+
+@method_decorator(cache_response(Author), name='dispatch')
+@method_decorator(idempotent, name='dispatch')
+class AuthorViewSet(ValuesReadMixin, viewsets.ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
+    # уникальный индекс по name уже покрывает ключ (name, id)
+    pagination_class = AuthorKeysetPagination
+    # удаление автора каскадом удаляет его книги — запросов тем больше, чем больше книг
+    query_budget = {'default': 6, 'create': 14, 'update': 14, 'partial_update': 14, 'destroy': None}
+
+    @conditional_view(Author)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_view(Author)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+@method_decorator(cache_response(Author, Book), name='dispatch')
+class FuzzySearchView(APIView):
+    """
+    Нечёткий поиск авторов и книг с опечатками (GET /api/search/fuzzy/?q=...).
+
+    ?type=author|book — искать только среди авторов или книг, ?limit= — число подсказок.
+    Подсказки отсортированы по схожести (доля общих триграмм, см. myapp/fuzzy.py).
+    """
+    limit = 10
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': ['This field is required.']})
+        kinds = [kind for kind, name in TYPES.items() if request.query_params.get('type', name) == name]
+        if not kinds:
+            raise ValidationError({'type': [f'Expected one of: {", ".join(TYPES.values())}.']})
+        limit = get_int_param(request, 'limit', self.limit, 1, self.max_limit)
+        return Response({'results': suggest(query, limit, kinds)})
+
+
+class AuthorAutocompleteView(APIView):
+    """
+    Подсказки авторов по началу имени или фамилии (GET /api/authors/autocomplete/?q=...).
+
+    Отвечает из индекса в памяти процесса (myapp/autocomplete.py) без запросов
+    к таблице авторов, поэтому не кэшируется. Используется виджетом выбора
+    автора в BookForm.
+    """
+    limit = 10
+    max_limit = 50
 
+    def get(self, request):
+        limit = get_int_param(request, 'limit', self.limit, 1, self.max_limit)
+        return Response({'results': author_index.search(request.query_params.get('q', ''), limit)})
@@ -0,0 +1,56 @@
+// Поле поиска над <select data-autocomplete-url="...">: варианты подгружаются по мере ввода
+// (виджет AutocompleteSelect в myapp/forms.py, ответ {"results": [{"id", "name"}]}).
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(function (select) {
+        var input = document.createElement('input');
+        input.type = 'search';
+        input.className = 'form-control form-control-sm mb-1';
+        input.placeholder = 'Начните вводить имя';
+        select.parentNode.insertBefore(input, select);
+
+        var timer = null;
+        var controller = null;
+
+        function load() {
+            var query = input.value.trim();
+            if (!query) {
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            var url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query);
+            fetch(url, {headers: {'Accept': 'application/json'}, signal: controller.signal})
+                .then(function (response) { return response.json(); })
+                .then(function (data) { fill(data.results); })
+                .catch(function () {});
+        }
+
+        function fill(results) {
+            var selected = select.options[select.selectedIndex];
+            var keep = [];
+            Array.prototype.forEach.call(select.options, function (option) {
+                if (option.value === '' || option === selected) {
+                    keep.push(option);
+                }
+            });
+            select.innerHTML = '';
+            keep.forEach(function (option) { select.appendChild(option); });
+            results.forEach(function (item) {
+                if (selected && String(item.id) === selected.value) {
+                    return;
+                }
+                select.appendChild(new Option(item.name, item.id));
+            });
+            if (results.length && (!selected || selected.value === '')) {
+                select.value = String(results[0].id);
+            }
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(load, 200);
+        });
+    });
+});